@@ -0,0 +1,42 @@
+import game
+
+from typing import Tuple
+import numpy as np
+
+
+def find_trivial_moves(states: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """applies the rules of Game.get_new_mine_squares and Game._update_uncertain_squares to a (B, columns, rows) state tensor.
+    returns a mask of the covered squares that must be mines and a mask of the ones that are safe to reveal"""
+    covered = states == game.COVERED
+    numbers = (states >= 0) & (states < game.MINE)
+    covered_counts = game.count_neighbors(covered)
+    mine_counts = game.count_neighbors(states == game.MINE)
+
+    # numbers whose covered neighbors are all mines / whose mines are all flagged
+    full = numbers & (covered_counts > 0) & (covered_counts + mine_counts == states)
+    finished = numbers & (covered_counts > 0) & (mine_counts == states)
+
+    mine_mask = covered & (game.count_neighbors(full) > 0)
+    safe_mask = covered & (game.count_neighbors(finished) > 0) & ~mine_mask
+    return mine_mask, safe_mask
+
+
+class BatchGame:
+    """the state of B boards of the same size as one (B, columns, rows) int8 tensor,
+    so the certain moves of all boards are found with a few array operations instead of one Game per board"""
+
+    def __init__(self, batch_size: int, size):
+        self.size = np.array(size)
+        self.states = np.full((batch_size, *self.size), game.COVERED, dtype=np.int8)
+
+    def update(self, revealed: np.ndarray, counts: np.ndarray):
+        """writes the numbers of newly revealed squares (boolean mask and count tensor) to the states"""
+        new = revealed & (self.states == game.COVERED)
+        self.states[new] = counts[new]
+
+    def add_flagged_mines(self, mine_mask: np.ndarray):
+        self.states[mine_mask] = game.MINE
+
+    def find_moves(self) -> Tuple[np.ndarray, np.ndarray]:
+        """returns the per board masks of squares to flag and squares to reveal"""
+        return find_trivial_moves(self.states)
@@ -0,0 +1,235 @@
+import game
+import simulator
+import locate
+import planner
+import batch
+import pipeline
+
+import argparse
+import time
+import tracemalloc
+import numpy as np
+
+
+def parse_board(text: str):
+    """parses a preset name like "hard" or a custom board like "30x16x99" (columns x rows x mines)"""
+    if text in game.PRESETS:
+        return text, game.PRESETS[text]
+    w, h, mines = (int(n) for n in text.split("x"))
+    return text, ((w, h), mines)
+
+
+def run_benchmark(size, mine_count: int, games: int, seed: int):
+    """plays a number of seeded games on one board size and returns the throughput stats"""
+    won = 0
+    moves = 0
+    guesses = 0
+    update_times = []
+    reevaluated_counts = []
+
+    start_time = time.perf_counter()
+    for i in range(games):
+        board = simulator.SimulatedBoard(size, mine_count, seed + i)
+        result = simulator.play_game(board)
+        won += result.won
+        moves += result.move_count
+        guesses += result.guess_count
+        update_times.extend(result.update_times)
+        reevaluated_counts.extend(result.reevaluated_counts)
+    total_time = time.perf_counter() - start_time
+
+    return {
+        "games/s": games / total_time,
+        "moves/s": moves / total_time,
+        "update ms": 1000 * np.mean(update_times),
+        "re-evals": np.mean(reevaluated_counts),
+        "guesses": guesses / games,
+        "win rate": won / games,
+    }
+
+
+def run_locate_benchmark(repeats: int, seed: int):
+    """times locating a hard board on synthetic screenshots at common screen resolutions"""
+    grass_colors = [(162, 209, 73), (170, 215, 81)]
+    dirt_colors = [(215, 184, 153), (229, 194, 159)]
+    border_colors = [(135, 175, 58)]
+    thresh = 100
+
+    board = simulator.SimulatedBoard.from_preset("hard", seed)
+    board.reveal_neighbors((12, 10))
+
+    print(f"{'screen':>10} {'locate ms':>10} {'found':>24}")
+    for name, resolution, square_size in [("1080p", (1920, 1080), 25), ("1440p", (2560, 1440), 33), ("4K", (3840, 2160), 50)]:
+        im_array = simulator.render_screenshot(board, resolution, square_size, (resolution[0] // 3, resolution[1] // 5))
+
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            game_rect = locate.find_game(im_array, grass_colors + dirt_colors + border_colors, thresh)
+            square_count = locate.find_square_count(im_array, game_rect, grass_colors + dirt_colors, thresh)
+        locate_time = (time.perf_counter() - start_time) / repeats
+
+        found = f"{game_rect[0]} {game_rect[1]} {square_count}"
+        print(f"{name:>10} {1000 * locate_time:>10.2f} {found:>24}")
+
+
+def run_dry_run(size, mine_count: int, games: int, seed: int, square_size=25):
+    """plays seeded games with and without the click planner against a mock mouse
+    and returns the average cursor travel and projected action time per game"""
+    game_rect = (np.zeros(2), np.array(size) * square_size)
+    stats = {}
+    for plan in (False, True):
+        travel_distance = 0
+        action_time = 0
+        for i in range(games):
+            board = simulator.SimulatedBoard(size, mine_count, seed + i)
+            dispatcher = planner.InputDispatcher(game_rect, np.array(size), dry_run=True)
+            simulator.play_game(board, plan, dispatcher)
+            travel_distance += dispatcher.travel_distance
+            action_time += dispatcher.action_time
+        stats[plan] = (travel_distance / games, action_time / games)
+    return stats
+
+
+def run_memory_benchmark(sizes, density: float, turns: int, seed: int):
+    """measures the memory a new game takes per square and the update time of the first turns on huge square boards"""
+    print(f"{'board':>12} {'bytes/sq':>9} {'game MB':>8} {'update ms':>10} {'turn ms':>8}")
+    for n in sizes:
+        size = np.array([n, n])
+        tracemalloc.start()
+        my_game = game.Game(size)
+        game_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del my_game
+
+        board = simulator.SimulatedBoard(size, int(density * n * n), seed)
+        start_time = time.perf_counter()
+        result = simulator.play_game(board, max_turns=turns)
+        turn_time = (time.perf_counter() - start_time) / len(result.update_times)
+
+        name = f"{n}x{n}"
+        print(f"{name:>12} {game_memory / (n * n):>9.2f} {game_memory / 1e6:>8.1f} "
+              f"{1000 * np.mean(result.update_times):>10.3f} {1000 * turn_time:>8.1f}")
+
+
+def run_first_move_benchmark(sizes, density: float, turns: int, seed: int, repeats=3):
+    """plays the first turns of huge square boards, then reads the whole board into a new game at once
+    and times how long it takes until the first move is known: with the full list of pipeline.get_moves
+    and with the generator Game.iter_moves. the time to drain the generator is printed too"""
+    print(f"{'board':>12} {'moves':>7} {'batch ms':>9} {'first ms':>9} {'stream ms':>10}")
+    for n in sizes:
+        size = np.array([n, n])
+        board = simulator.SimulatedBoard(size, int(density * n * n), seed)
+        simulator.play_game(board, max_turns=turns)
+        new_values = board.read_square_values(game.SquareSet(size, fill=True))
+
+        batch_time = 0
+        first_time = 0
+        stream_time = 0
+        for _ in range(repeats):
+            # iterating moves flags mines in the game, so every run needs its own
+            my_game = game.Game(size)
+            my_game.update(new_values)
+            start_time = time.perf_counter()
+            move_count = len(pipeline.get_moves(my_game, set()))
+            batch_time += time.perf_counter() - start_time
+
+            my_game = game.Game(size)
+            my_game.update(new_values)
+            start_time = time.perf_counter()
+            moves = my_game.iter_moves()
+            next(moves, None)
+            first_time += time.perf_counter() - start_time
+            for _ in moves:
+                pass
+            stream_time += time.perf_counter() - start_time
+
+        name = f"{n}x{n}"
+        print(f"{name:>12} {move_count:>7} {1000 * batch_time / repeats:>9.2f} "
+              f"{1000 * first_time / repeats:>9.3f} {1000 * stream_time / repeats:>10.2f}")
+
+
+def run_batch_benchmark(size, mine_count: int, batch_size: int, seed: int):
+    """advances a batch of boards with the trivial rules of the batch solver until no board has a certain move left
+    and returns the step count and speed. no guesses are made, boards that would need one stay unsolved"""
+    boards = simulator.SimulatedBatch(batch_size, size, mine_count, seed)
+    batch_game = batch.BatchGame(batch_size, size)
+    boards.first_click((size[0] // 2, size[1] // 2))
+
+    steps = 0
+    start_time = time.perf_counter()
+    while True:
+        batch_game.update(boards.revealed, boards.counts)
+        mine_mask, safe_mask = batch_game.find_moves()
+        if not (mine_mask.any() or safe_mask.any()):
+            break
+        batch_game.add_flagged_mines(mine_mask)
+        boards.reveal(safe_mask)
+        steps += 1
+    total_time = time.perf_counter() - start_time
+
+    return {
+        "steps": steps,
+        "step ms": 1000 * total_time / max(steps, 1),
+        "board steps/s": batch_size * steps / total_time,
+        "solved": boards.is_won.mean(),
+        "lost": boards.is_lost.mean(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="plays simulated minesweeper games to measure the bot's speed")
+    parser.add_argument("boards", nargs="*", default=["easy", "medium", "hard"],
+                        help="presets (easy, medium, hard) or custom boards as WxHxMINES")
+    parser.add_argument("-n", "--games", type=int, default=200, help="games per board")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="compare cursor travel and action time with and without the click planner")
+    parser.add_argument("--locate", action="store_true", help="benchmark locating the game on screenshots instead")
+    parser.add_argument("--memory", action="store_true",
+                        help="measure memory per square and update time on 100x100, 500x500 and 1000x1000 boards instead")
+    parser.add_argument("--first-move", action="store_true",
+                        help="compare the time to the first move of the move list and the move generator on 100x100, "
+                             "500x500 and 1000x1000 boards instead")
+    parser.add_argument("--batch", type=int, metavar="B",
+                        help="advance B boards at once with the batch solver's trivial rules instead")
+    args = parser.parse_args()
+
+    if args.locate:
+        run_locate_benchmark(args.games, args.seed)
+        return
+
+    if args.memory:
+        run_memory_benchmark([100, 500, 1000], 0.15, args.games, args.seed)
+        return
+
+    if args.first_move:
+        run_first_move_benchmark([100, 500, 1000], 0.15, args.games, args.seed)
+        return
+
+    if args.batch:
+        print(f"{'board':>12} {'steps':>6} {'step ms':>8} {'board steps/s':>14} {'solved':>8} {'lost':>6}")
+        for text in args.boards:
+            name, (size, mine_count) = parse_board(text)
+            stats = run_batch_benchmark(size, mine_count, args.batch, args.seed)
+            print(f"{name:>12} {stats['steps']:>6} {stats['step ms']:>8.2f} {stats['board steps/s']:>14.0f} "
+                  f"{stats['solved']:>8.2%} {stats['lost']:>6.2%}")
+        return
+
+    if args.dry_run:
+        print(f"{'board':>12} {'travel px':>10} {'planned':>10} {'time s':>8} {'planned':>8}")
+        for text in args.boards:
+            name, (size, mine_count) = parse_board(text)
+            stats = run_dry_run(size, mine_count, args.games, args.seed)
+            print(f"{name:>12} {stats[False][0]:>10.0f} {stats[True][0]:>10.0f} {stats[False][1]:>8.1f} {stats[True][1]:>8.1f}")
+        return
+
+    print(f"{'board':>12} {'games/s':>10} {'moves/s':>10} {'update ms':>10} {'re-evals':>9} {'guesses':>8} {'win rate':>9}")
+    for text in args.boards:
+        name, (size, mine_count) = parse_board(text)
+        stats = run_benchmark(size, mine_count, args.games, args.seed)
+        print(f"{name:>12} {stats['games/s']:>10.1f} {stats['moves/s']:>10.1f} "
+              f"{stats['update ms']:>10.3f} {stats['re-evals']:>9.1f} {stats['guesses']:>8.2f} {stats['win rate']:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
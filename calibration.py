@@ -0,0 +1,109 @@
+import capture
+import locate
+
+from typing import Tuple, List, Optional
+from dataclasses import dataclass, asdict
+import json
+import os
+import numpy as np
+
+Color = Tuple[int, int, int]
+
+
+@dataclass
+class Calibration:
+    """everything found about the game on the screen, saved so a restart doesn't have to search for it again
+    as long as the browser window hasn't moved"""
+    game_pos: List[int]
+    game_size: List[int]
+    square_count: List[int]
+    grass_colors: List[Color]
+    dirt_colors: List[Color]
+    border_colors: List[Color]
+    # name of the number recognizer and the images it compares squares to, if it uses any
+    recognizer: str = ""
+    template_path: str = ""
+
+    @property
+    def game_rect(self) -> Tuple[np.ndarray, np.ndarray]:
+        return np.array(self.game_pos), np.array(self.game_size)
+
+    @property
+    def square_size(self) -> np.ndarray:
+        return np.array(self.game_size) / np.array(self.square_count)
+
+    def __post_init__(self):
+        # json stores the colors as lists
+        self.grass_colors = to_colors(self.grass_colors)
+        self.dirt_colors = to_colors(self.dirt_colors)
+        self.border_colors = to_colors(self.border_colors)
+
+    def has_palette(self, grass_colors: List[Color], dirt_colors: List[Color], border_colors: List[Color]) -> bool:
+        """checks if the calibration was made with these colors"""
+        return (self.grass_colors, self.dirt_colors, self.border_colors) == \
+            (to_colors(grass_colors), to_colors(dirt_colors), to_colors(border_colors))
+
+    def save(self, path: str):
+        with open(path, "w") as file:
+            json.dump(asdict(self), file, indent=2)
+
+    def get_sample_points(self) -> Tuple[np.ndarray, np.ndarray]:
+        """returns pixels just inside the corners of the game rect and the corners of its first squares,
+        and pixels just outside the middle of its edges"""
+        x0, y0 = self.game_pos
+        x1, y1 = x0 + self.game_size[0] - 1, y0 + self.game_size[1] - 1
+        sx, sy = np.floor(self.square_size).astype(int)
+        inside = [(x0 + 2, y0 + 2), (x1 - 2, y0 + 2), (x0 + 2, y1 - 2), (x1 - 2, y1 - 2), (x0 + sx + 2, y0 + 2), (x0 + 2, y0 + sy + 2)]
+        mid_x, mid_y = (x0 + x1) // 2, (y0 + y1) // 2
+        outside = [(x0 - 2, mid_y), (x1 + 2, mid_y), (mid_x, y0 - 2), (mid_x, y1 + 2)]
+        return np.array(inside), np.array(outside)
+
+    def is_valid(self, screen: capture.Capture, thresh) -> bool:
+        """checks a few pixels around the border of the game rect: the corners of the board have to be square colors,
+        neighboring squares have to alternate between the light and the dark shade and the outside mustn't be the board"""
+        inside, outside = self.get_sample_points()
+        points = np.concatenate([inside, outside])
+        region_pos = points.min(axis=0)
+        if (region_pos < 0).any():
+            return False
+        im_array = screen.grab((region_pos, points.max(axis=0) - region_pos + 1))
+        if im_array.shape[0] <= (points - region_pos)[:, 1].max() or im_array.shape[1] <= (points - region_pos)[:, 0].max():
+            return False
+
+        pixels = im_array[points[:, 1] - region_pos[1], points[:, 0] - region_pos[0]]
+        square_colors = self.grass_colors + self.dirt_colors
+        inside_classes = locate.get_color_classes(pixels[:len(inside)], square_colors, thresh)
+        outside_classes = locate.get_color_classes(pixels[len(inside):], square_colors + self.border_colors, thresh)
+        if (inside_classes == -1).any() or (outside_classes != -1).any():
+            return False
+        # the light and dark colors alternate, so the first square and its neighbors have different shades
+        shades = inside_classes % 2
+        return shades[4] != shades[0] and shades[5] != shades[0]
+
+
+def to_colors(colors) -> List[Color]:
+    return [tuple(int(n) for n in color) for color in colors]
+
+
+def create(
+        game_rect: Tuple[np.ndarray, np.ndarray],
+        square_count: np.ndarray,
+        grass_colors: List[Color],
+        dirt_colors: List[Color],
+        border_colors: List[Color],
+        recognizer: str,
+        template_path="") -> Calibration:
+    return Calibration(
+        [int(n) for n in game_rect[0]], [int(n) for n in game_rect[1]], [int(n) for n in square_count],
+        grass_colors, dirt_colors, border_colors, recognizer, template_path)
+
+
+def load(path: str) -> Optional[Calibration]:
+    """returns the saved calibration or None if there is none or it can't be read"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as file:
+            return Calibration(**json.load(file))
+    except (ValueError, TypeError):
+        return None
@@ -0,0 +1,99 @@
+import metrics
+
+from abc import ABC, abstractmethod
+from typing import Tuple, Optional, List
+import numpy as np
+import time
+
+
+class Capture(ABC):
+    """grabs screenshots as (h, w, 3) RGB arrays. if a game rect is given only that part of the screen is grabbed.
+    keeps the latency of the last grabs to compare backends"""
+
+    def __init__(self):
+        self.latencies = []
+
+    @property
+    def last_latency(self) -> float:
+        return self.latencies[-1] if self.latencies else 0
+
+    def grab(self, game_rect: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+        start = time.perf_counter()
+        bbox = None
+        if game_rect is not None:
+            x, y = (int(n) for n in game_rect[0])
+            w, h = (int(n) for n in game_rect[1])
+            bbox = (x, y, x + w, y + h)
+
+        with metrics.span("capture"):
+            im_array = self._grab(bbox)
+        self.latencies.append(time.perf_counter() - start)
+        return im_array
+
+    @abstractmethod
+    def _grab(self, bbox) -> np.ndarray:
+        """grabs the bbox (left, top, right, bottom) of the screen, or all of it if bbox is None"""
+
+
+class PilCapture(Capture):
+    """grabs the screen with PIL's ImageGrab"""
+
+    def _grab(self, bbox) -> np.ndarray:
+        from PIL import ImageGrab
+        # slicing off a possible alpha channel is cheaper than another copy with convert("RGB")
+        return np.asarray(ImageGrab.grab(bbox=bbox))[:, :, :3]
+
+
+class MssCapture(Capture):
+    """grabs the screen with the (faster) native mss grabber"""
+
+    def __init__(self):
+        super().__init__()
+        import mss
+        self.sct = mss.mss()
+
+    def _grab(self, bbox) -> np.ndarray:
+        if bbox is None:
+            monitor = self.sct.monitors[0]
+        else:
+            monitor = {"left": bbox[0], "top": bbox[1], "width": bbox[2] - bbox[0], "height": bbox[3] - bbox[1]}
+        # mss returns BGRA pixels
+        return np.asarray(self.sct.grab(monitor))[:, :, 2::-1]
+
+
+class ArrayCapture(Capture):
+    """returns frames from arrays or image files instead of the screen, for tests and replays.
+    the last frame is repeated once all frames have been grabbed"""
+
+    def __init__(self, frames: List):
+        super().__init__()
+        self.frames = frames
+        self.index = 0
+
+    def _grab(self, bbox) -> np.ndarray:
+        frame = self.frames[min(self.index, len(self.frames) - 1)]
+        self.index += 1
+
+        if isinstance(frame, str):
+            from PIL import Image
+            frame = np.asarray(Image.open(frame).convert("RGB"))
+        if bbox is not None:
+            frame = frame[bbox[1]:bbox[3], bbox[0]:bbox[2]]
+        return frame[:, :, :3]
+
+
+def create_capture(backend: Optional[str] = None) -> Capture:
+    """creates a capture backend by name ("pil" or "mss"). picks mss if it's installed and no name is given"""
+    if backend == "pil":
+        return PilCapture()
+    if backend == "mss":
+        return MssCapture()
+    try:
+        return MssCapture()
+    except ImportError:
+        return PilCapture()
+
+
+def get_local_rect(game_rect: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """returns the game rect relative to a frame that was grabbed only from the game rect"""
+    return np.zeros(2, dtype=int), game_rect[1]
@@ -0,0 +1,46 @@
+import grid
+import game
+
+from typing import Tuple, Collection, List
+import numpy as np
+
+
+def get_square_fingerprints(im_array: np.ndarray, game_rect: Tuple[np.ndarray, np.ndarray], square_count: np.ndarray) -> np.ndarray:
+    """returns the mean color and mean squared color of every square as a (columns, rows, 6) array"""
+    pixels = im_array[:, :, :3].astype(np.int64)
+    return grid.get_square_means(np.concatenate([pixels, pixels ** 2], axis=2), game_rect, square_count)
+
+
+class FrameCache:
+    """remembers a fingerprint of every square of the last frame,
+    so only squares that changed since then have to be recognized again"""
+
+    def __init__(self, tolerance=0.0):
+        # screenshots of unchanged squares are pixel identical, so by default any difference counts
+        self.tolerance = tolerance
+        self.fingerprints = None
+        # squares that were skipped / had to be read in the last frame
+        self.hits = 0
+        self.misses = 0
+
+    def get_changed_squares(
+            self,
+            im_array: np.ndarray,
+            game_rect: Tuple[np.ndarray, np.ndarray],
+            square_count: np.ndarray,
+            squares: Collection[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """returns the squares whose fingerprint changed since the last frame and remembers the new frame"""
+        fingerprints = get_square_fingerprints(im_array, game_rect, square_count)
+
+        if self.fingerprints is None or self.fingerprints.shape != fingerprints.shape:
+            changed = np.ones(fingerprints.shape[:2], dtype=bool)
+        else:
+            changed = (np.abs(fingerprints - self.fingerprints) > self.tolerance).any(axis=2)
+        self.fingerprints = fingerprints
+
+        # only the changed squares are turned into tuples, not all squares asked for
+        changed &= game.get_square_mask(squares, changed.shape)
+        changed_squares = list(zip(*(axis.tolist() for axis in np.nonzero(changed))))
+        self.misses = len(changed_squares)
+        self.hits = len(squares) - self.misses
+        return changed_squares
@@ -1,22 +1,140 @@
 import numpy as np
-from typing import Dict, Tuple, Set
+from typing import Dict, Tuple, Set, Iterable, Iterator, Collection
+
+COVERED = -1
+MINE = 9
+# board sizes (columns, rows) and mine counts of the google minesweeper difficulties
+PRESETS = {
+    "easy": ((10, 8), 10),
+    "medium": ((18, 14), 40),
+    "hard": ((24, 20), 99),
+}
+# offsets of the 8 neighbors of a square
+NEIGHBOR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx != 0 or dy != 0]
+# uncertain squares checked for mines at once by Game.iter_moves, small enough for the first move to come quickly
+MOVE_CHUNK_SIZE = 64
+
+
+def get_preset_mine_count(size):
+    """returns the number of mines of the google difficulty with this board size or None for unknown sizes"""
+    for preset_size, mine_count in PRESETS.values():
+        if tuple(size) == preset_size:
+            return mine_count
+    return None
+
+
+def count_neighbors(mask: np.ndarray) -> np.ndarray:
+    """counts for every square how many of its neighbors are set in a boolean mask.
+    the mask can have leading batch axes, only the last two axes are the board"""
+    w, h = mask.shape[-2:]
+    padded = np.pad(mask, [(0, 0)] * (mask.ndim - 2) + [(1, 1), (1, 1)]).astype(np.int8)
+    counts = np.zeros(mask.shape, dtype=np.int8)
+    for dx, dy in NEIGHBOR_OFFSETS:
+        counts += padded[..., 1 + dx:1 + dx + w, 1 + dy:1 + dy + h]
+    return counts
+
+
+def get_square_mask(squares: Iterable[Tuple[int, int]], size) -> np.ndarray:
+    """returns a (columns, rows) boolean mask of the squares, without iterating them if they are a SquareSet"""
+    if isinstance(squares, SquareSet):
+        return squares.mask
+    mask = np.zeros(tuple(size), dtype=bool)
+    coords = np.array([tuple(s) for s in squares], dtype=np.intp).reshape(-1, 2)
+    mask[coords[:, 0], coords[:, 1]] = True
+    return mask
+
+
+class SquareSet:
+    """a set of squares stored as a boolean mask over the board, so even a board with millions of squares
+    takes one byte per square. squares are yielded lazily column by column when iterating"""
+
+    def __init__(self, size, fill=False):
+        self.mask = np.full(tuple(size), fill, dtype=bool)
+        self._count = self.mask.size if fill else 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, square) -> bool:
+        # negative indices would wrap around to the other side of the mask, too large ones raise IndexError
+        try:
+            if square[0] < 0 or square[1] < 0:
+                return False
+            return bool(self.mask[tuple(square)])
+        except (TypeError, IndexError):
+            return False
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for x in np.flatnonzero(self.mask.any(axis=1)).tolist():
+            for y in np.flatnonzero(self.mask[x]).tolist():
+                yield x, y
+
+    def __and__(self, squares) -> Set[Tuple[int, int]]:
+        return set(s for s in squares if s in self)
+
+    __rand__ = __and__
+
+    def __repr__(self):
+        return f"SquareSet({len(self)} of {self.mask.size} squares)"
+
+    def add(self, square):
+        if square[0] < 0 or square[1] < 0:
+            raise IndexError(f"square {square} is outside of the board")
+        square = tuple(square)
+        if not self.mask[square]:
+            self.mask[square] = True
+            self._count += 1
+
+    def remove(self, square):
+        if square not in self:
+            raise KeyError(square)
+        self.discard(square)
+
+    def discard(self, square):
+        if square[0] < 0 or square[1] < 0:
+            return
+        square = tuple(square)
+        if self.mask[square]:
+            self.mask[square] = False
+            self._count -= 1
+
+    def update(self, squares: Iterable[Tuple[int, int]]):
+        for square in squares:
+            self.add(square)
+
+    def difference_update(self, squares: Iterable[Tuple[int, int]]):
+        for square in squares:
+            self.discard(square)
+
 
 class Game:
     def __init__(self, size: np.ndarray):
         self.size = size
-        self.state = -np.ones(tuple(size), dtype=np.int32)
-        
         rows, cols = self.size
-        square_coords = np.indices((rows, cols)).reshape(2, -1).T
-        
+
+        # state with a border of padding squares around it, so the neighbors of every square
+        # are at the same flat index offsets and no neighbor table or bounds checks are needed
+        padded_state = np.zeros((rows + 2, cols + 2), dtype=np.int8)
+        padded_state[1:-1, 1:-1] = COVERED
+        self.flat_state = padded_state.reshape(-1)
+        # 2d view on the squares inside the border
+        self.state = padded_state[1:-1, 1:-1]
+        self.padded_cols = cols + 2
+        self.neighbor_offsets = np.array([dx * self.padded_cols + dy for dx, dy in NEIGHBOR_OFFSETS])
+
+        # the square sets are boolean masks, so large custom boards don't need a python tuple per square
         # squares that are covered (and not a mine maybe?)
-        self.covered_squares = set([tuple(coord) for coord in square_coords])
+        self.covered_squares = SquareSet(self.size, fill=True)
         # squares that are revealed but still have covered neighbors (not mines) left
-        self.uncertain_squares = set()
+        self.uncertain_squares = SquareSet(self.size)
         # squares which meet their mine numbers so covered neighbors can be revealed
-        self.clickable_squares = set()
+        self.clickable_squares = SquareSet(self.size)
         # squares with mines under them
-        self.flagged_mines = set()
+        self.flagged_mines = SquareSet(self.size)
+        # revealed numbers that contradict their neighbors, so they or a number next to them were misread
+        self.inconsistent_squares = set()
+        # number of squares re-evaluated by the last update (to see the cost scale with the changes)
+        self.reevaluated_count = 0
         
         # self.update_state(initial_values)
 
@@ -38,68 +156,188 @@ class Game:
         return self.state[tuple(square)]
     
     def update(self, new_values: Dict[Tuple[int, int], int]):
-        self._update_state(new_values)
+        """writes new values of squares to the game. values of revealed squares can be corrected
+        by reading them again, even back to COVERED"""
+        self._reset_corrected_squares(new_values)
+        changed_squares = self._update_state(new_values)
         self._update_covered_squares(new_values)
-        self._update_uncertain_squares()
-        self._update_clickable_squares()
+        self._reevaluate(changed_squares)
     
     def get_new_mine_squares(self):
-        unflagged_mines = set()
-        for square in self.uncertain_squares:
-            neighbors = self.get_covered_neighbors(square)
-            mine_count = self.get_neighbor_mine_count(square)
-            
-            if len(neighbors) + mine_count == self.square_val(square):
-                unflagged_mines.update([tuple(s) for s in neighbors])
-        return unflagged_mines
+        """returns the covered neighbors of uncertain squares that have as many covered and flagged neighbors as their number.
+        only the uncertain squares are looked at, not the whole board"""
+        return self._to_squares(self._find_mine_indices(self._get_uncertain_indices()))
+
+    def iter_moves(self, issued_moves: Collection[Tuple[str, Tuple[int, int]]] = ()) -> Iterator[Tuple[str, Tuple[int, int]]]:
+        """yields the certain moves as (action name, square) pairs as soon as each one is found, skipping issued moves.
+        chords that are known already come first, then mines are searched a few uncertain squares at a time.
+        a mine is flagged in the game when its move is yielded, followed by the chords it makes possible.
+        the solver is only asked if these rules find nothing. the caller can stop at any move"""
+        yielded = set(issued_moves)
+        for square in list(self.clickable_squares):
+            if ("reveal_neighbors", square) not in yielded:
+                yielded.add(("reveal_neighbors", square))
+                yield "reveal_neighbors", square
+        found_any = len(yielded) > len(issued_moves)
+
+        uncertain_indices = self._get_uncertain_indices()
+        for start in range(0, len(uncertain_indices), MOVE_CHUNK_SIZE):
+            mine_squares = self._to_squares(self._find_mine_indices(uncertain_indices[start:start + MOVE_CHUNK_SIZE]))
+            for move in self._flag_mines(mine_squares, yielded):
+                found_any = True
+                yield move
+        if found_any:
+            return
+
+        # solver imports game, so it's only imported once the simple rules are stuck
+        import solver
+        deduction = solver.find_certain_squares(self)
+        yield from self._flag_mines(deduction.mine_squares, yielded)
+        for square in deduction.safe_squares:
+            if ("reveal_square", square) not in yielded:
+                yield "reveal_square", square
+
+    def _flag_mines(self, mine_squares: Iterable[Tuple[int, int]], yielded: Set[Tuple[str, Tuple[int, int]]]):
+        """flags the mines one by one and yields each flag and then the chords around it that became possible"""
+        for square in mine_squares:
+            if self.state[square] == MINE:
+                continue
+            self.add_flagged_mine(square)
+            if ("mark_mine", square) not in yielded:
+                yielded.add(("mark_mine", square))
+                yield "mark_mine", square
+            for neighbor in self.clickable_squares & self.get_neighbor_squares(square):
+                if ("reveal_neighbors", neighbor) not in yielded:
+                    yielded.add(("reveal_neighbors", neighbor))
+                    yield "reveal_neighbors", neighbor
+
+    def _get_uncertain_indices(self) -> np.ndarray:
+        rows, cols = np.nonzero(self.uncertain_squares.mask)
+        return (rows + 1) * self.padded_cols + cols + 1
+
+    def _find_mine_indices(self, indices: np.ndarray) -> np.ndarray:
+        """returns the covered neighbors of the squares (flat indices) that have as many covered and flagged neighbors as their number"""
+        neighbors = indices[:, None] + self.neighbor_offsets
+        neighbor_values = self.flat_state[neighbors]
+        covered = neighbor_values == COVERED
+        mine_counts = np.count_nonzero(covered | (neighbor_values == MINE), axis=1)
+
+        full = mine_counts == self.flat_state[indices]
+        return np.unique(neighbors[full][covered[full]])
     
     def add_flagged_mine(self, square):
         self.covered_squares.remove(square)
         self.flagged_mines.add(square)
         self.state[tuple(square)] = 9
-        self._update_uncertain_squares()
-        self._update_clickable_squares()
-        
-    def _update_state(self, new_values: Dict[tuple, int]):
+        self._reevaluate([square])
+
+    def _reevaluate(self, changed_squares):
+        """re-evaluates only the tracked squares next to squares that changed"""
+        dirty_indices = self._get_dirty_indices(changed_squares)
+        dirty_squares = self._to_squares(dirty_indices)
+        self.reevaluated_count = 0
+        self._update_uncertain_squares(dirty_squares)
+        self._update_clickable_squares(dirty_squares)
+        if len(self.inconsistent_squares) > 0:
+            self.inconsistent_squares.difference_update(dirty_squares)
+        self.inconsistent_squares.update(self._find_inconsistent(dirty_indices))
+
+    def _find_inconsistent(self, indices: np.ndarray) -> Set[Tuple[int, int]]:
+        """returns the revealed numbers among the squares (flat indices) that can't be right:
+        with more flagged neighbors than the number or fewer covered and flagged neighbors than the number"""
+        values = self.flat_state[indices]
+        numbers = indices[(values >= 0) & (values < MINE)]
+        neighbor_values = self.flat_state[numbers[:, None] + self.neighbor_offsets]
+        mine_counts = np.count_nonzero(neighbor_values == MINE, axis=1)
+        open_counts = mine_counts + np.count_nonzero(neighbor_values == COVERED, axis=1)
+        values = self.flat_state[numbers]
+        return self._to_squares(numbers[(mine_counts > values) | (open_counts < values)])
+
+    def get_reread_squares(self) -> Set[Tuple[int, int]]:
+        """returns the inconsistent numbers and the revealed numbers around them, one of them must have been misread.
+        reading only these again is enough to fix the game, the rest of the board doesn't have to be read"""
+        reread_squares = set(self.inconsistent_squares)
+        for square in self.inconsistent_squares:
+            indices = self._neighbor_indices(square)
+            values = self.flat_state[indices]
+            reread_squares.update(self._to_squares(indices[self._is_inside(indices) & (values >= 0) & (values < MINE)]))
+        return reread_squares
+
+    def _get_dirty_indices(self, changed_squares) -> np.ndarray:
+        """returns the flat indices of the changed squares and their neighbors, the only squares whose state can be affected"""
+        if len(changed_squares) == 0:
+            return np.zeros(0, dtype=np.intp)
+        indices = np.array([self._flat_index(square) for square in changed_squares])
+        dirty = np.unique(np.concatenate([indices, (indices[:, None] + self.neighbor_offsets).ravel()]))
+        return dirty[self._is_inside(dirty)]
+
+    def _reset_corrected_squares(self, new_values: Dict[tuple, int]):
+        """stops tracking revealed squares whose value changed as clickable, they are judged again by their new value"""
+        corrected_squares = [s for s, v in new_values.items() if s not in self.covered_squares and self.state[s] != v]
+        self.clickable_squares.difference_update(corrected_squares)
+        self.uncertain_squares.difference_update(corrected_squares)
+
+    def _update_state(self, new_values: Dict[tuple, int]) -> Set[Tuple[int, int]]:
+        """writes the new values to the state and returns the squares that actually changed"""
+        changed_squares = set()
         for square, value in new_values.items():
-            self.state[square] = value
+            if self.state[square] != value:
+                self.state[square] = value
+                changed_squares.add(square)
+        return changed_squares
 
     def _update_covered_squares(self, new_values: Dict[tuple, int]):
         """unlists covered squares if they have been revealed.
         flags all revealed squares as uncertain (pls update uncertain next) (pls don't list mines in new_values)"""
         uncovered_squares = set([s for s, v in new_values.items() if v != -1])
         self.covered_squares.difference_update(uncovered_squares)
+        # squares that were misread as revealed
+        self.covered_squares.update([s for s, v in new_values.items() if v == -1])
         # add all new squares
         self.uncertain_squares.update(uncovered_squares)
 
-    def _update_clickable_squares(self):
+    def _update_clickable_squares(self, dirty_squares: Set[Tuple[int, int]]):
         """remove clickable squares if by other actions nothing is left to click"""
-        self.clickable_squares = set([s for s in self.clickable_squares if len(self.get_covered_neighbors(s)) > 0])
+        dirty_clickable = self.clickable_squares & dirty_squares
+        self.reevaluated_count += len(dirty_clickable)
+        self.clickable_squares.difference_update([s for s in dirty_clickable if self.get_covered_count(s) == 0])
 
-    def _update_uncertain_squares(self):
+    def _update_uncertain_squares(self, dirty_squares: Set[Tuple[int, int]]):
         """remove squares that have all their mines flagged. add them to clickable, if neighbors are still covered"""
+        dirty_uncertain = self.uncertain_squares & dirty_squares
+        self.reevaluated_count += len(dirty_uncertain)
         # squares that meet their mine count
-        finished_squares = set([s for s in self.uncertain_squares if self.get_neighbor_mine_count(s) == self.square_val(s)])
+        finished_squares = set([s for s in dirty_uncertain if self.get_neighbor_mine_count(s) == self.state[s]])
         self.uncertain_squares.difference_update(finished_squares)
-        self.clickable_squares.update([s for s in finished_squares if len(self.get_covered_neighbors(s)) > 0])
+        self.clickable_squares.update([s for s in finished_squares if self.get_covered_count(s) > 0])
     
     def get_neighbor_mine_count(self, square) -> int:
-        return len([s for s in self.get_neighbor_squares(square) if self.square_val(s) == 9])
+        return int(np.count_nonzero(self.flat_state[self._neighbor_indices(square)] == MINE))
     
+    def get_covered_count(self, square) -> int:
+        return int(np.count_nonzero(self.flat_state[self._neighbor_indices(square)] == COVERED))
+
     def get_covered_neighbors(self, square) -> Set[Tuple[int, int]]:
-        return set([s for s in self.get_neighbor_squares(square) if self.square_val(s) == -1])
+        indices = self._neighbor_indices(square)
+        return self._to_squares(indices[self.flat_state[indices] == COVERED])
         
     def get_neighbor_squares(self, square) -> Set[Tuple[int, int]]:
-        neighbors = set()
+        indices = self._neighbor_indices(square)
+        return self._to_squares(indices[self._is_inside(indices)])
+
+    def _flat_index(self, square) -> int:
         row, col = square
-        
-        min_x = max(0, row - 1)
-        min_y = max(0, col - 1)
-        max_x = min(self.size[0], row + 2)
-        max_y = min(self.size[1], col + 2)
-    
-        for y in range(min_y, max_y):
-            for x in range(min_x, max_x):
-                if x != row or y != col:
-                    neighbors.add((x, y))
-        return neighbors
\ No newline at end of file
+        return (row + 1) * self.padded_cols + col + 1
+
+    def _neighbor_indices(self, square) -> np.ndarray:
+        """returns the flat indices of the neighbors of a square, including padding indices"""
+        return self._flat_index(square) + self.neighbor_offsets
+
+    def _is_inside(self, indices: np.ndarray) -> np.ndarray:
+        rows, cols = np.divmod(indices, self.padded_cols)
+        return (rows >= 1) & (rows <= self.size[0]) & (cols >= 1) & (cols <= self.size[1])
+
+    def _to_squares(self, indices: np.ndarray) -> Set[Tuple[int, int]]:
+        """converts flat indices of squares inside the border to squares"""
+        rows, cols = np.divmod(indices, self.padded_cols)
+        return set(zip((rows - 1).tolist(), (cols - 1).tolist()))
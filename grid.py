@@ -0,0 +1,55 @@
+import locate
+
+from typing import Tuple
+import numpy as np
+
+COVERED = -1
+ZERO = 0
+# revealed squares with a number on them that has to be recognized
+NUMBER = -2
+
+
+def get_square_bounds(game_rect: Tuple[np.ndarray, np.ndarray], square_count: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """returns the pixel borders between the squares (relative to the game rect) along x and y"""
+    square_size = game_rect[1] / square_count
+    xs = np.round(np.arange(square_count[0] + 1) * square_size[0]).astype(int)
+    ys = np.round(np.arange(square_count[1] + 1) * square_size[1]).astype(int)
+    return xs, ys
+
+
+def get_square_means(
+        values: np.ndarray,
+        game_rect: Tuple[np.ndarray, np.ndarray],
+        square_count: np.ndarray,
+        padding=0) -> np.ndarray:
+    """returns the mean of a (h, w, c) array over every square (shrunk by padding) as a (columns, rows, c) array.
+    squares are rarely a whole number of pixels wide, so instead of reshaping into blocks
+    all sums are read from one integral image of the game rect"""
+    x, y = game_rect[0].astype(int)
+    w, h = game_rect[1].astype(int)
+    rect_values = values[y:y + h, x:x + w].astype(np.int64)
+
+    integral = np.zeros((h + 1, w + 1, rect_values.shape[2]), dtype=np.int64)
+    integral[1:, 1:] = rect_values.cumsum(axis=0).cumsum(axis=1)
+
+    xs, ys = get_square_bounds(game_rect, square_count)
+    x0, x1 = xs[:-1, None] + padding, xs[1:, None] - padding
+    y0, y1 = ys[None, :-1] + padding, ys[None, 1:] - padding
+    sums = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    areas = ((x1 - x0) * (y1 - y0))[:, :, None]
+    return sums / areas
+
+
+def classify_squares(
+        im_array: np.ndarray,
+        game_rect: Tuple[np.ndarray, np.ndarray],
+        square_count: np.ndarray,
+        grass_colors, dirt_colors, thresh, padding=4) -> np.ndarray:
+    """classifies all squares at once by their mean color as COVERED, ZERO or NUMBER (to be read)"""
+    mean_colors = get_square_means(im_array[:, :, :3], game_rect, square_count, padding)
+    color_classes = locate.get_color_classes(mean_colors, grass_colors + dirt_colors, thresh)
+
+    classes = np.full(color_classes.shape, NUMBER, dtype=np.int8)
+    classes[(color_classes >= 0) & (color_classes < len(grass_colors))] = COVERED
+    classes[color_classes >= len(grass_colors)] = ZERO
+    return classes
@@ -0,0 +1,70 @@
+from typing import Tuple, Optional, List
+import numpy as np
+
+Color = Tuple[int, int, int]
+
+
+def get_color_classes(im_array: np.ndarray, colors: List[Color], thresh) -> np.ndarray:
+    """returns the index of the closest color for every pixel, or -1 where no color is closer than the threshold"""
+    pixels = im_array[..., :3].astype(np.int32)
+    classes = -np.ones(pixels.shape[:-1], dtype=np.int8)
+    min_diffs = np.full(pixels.shape[:-1], thresh, dtype=np.int32)
+
+    for i, color in enumerate(colors):
+        diffs = ((pixels - np.array(color, dtype=np.int32)) ** 2).sum(axis=-1)
+        closer = diffs < min_diffs
+        classes[closer] = i
+        min_diffs[closer] = diffs[closer]
+    return classes
+
+
+def get_color_mask(im_array: np.ndarray, colors: List[Color], thresh) -> np.ndarray:
+    return get_color_classes(im_array, colors, thresh) != -1
+
+
+def find_game(im_array: np.ndarray, square_colors: List[Color], thresh) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """finds the rect (position and size) of the game on a screenshot.
+    a coarse grid of pixels is searched for a game color first, then the rect around it is extracted from the color mask"""
+    step = 20
+    coarse_mask = get_color_mask(im_array[::step, ::step], square_colors, thresh)
+    # search column by column like the original pixel walk did
+    matches = np.argwhere(coarse_mask.T)
+    if len(matches) == 0:
+        return None
+
+    start = matches[0] * step
+    # only classify the pixels in the rows and columns through the start point (and later the rect corner)
+    x, y = start
+    left = walk(get_color_mask(im_array[y], square_colors, thresh), x, -1)
+    top = walk(get_color_mask(im_array[:, left], square_colors, thresh), y, -1)
+    right = walk(get_color_mask(im_array[top], square_colors, thresh), left, 1)
+    bottom = walk(get_color_mask(im_array[:, right], square_colors, thresh), top, 1)
+
+    rect_min = np.array([left, top])
+    rect_max = np.array([right, bottom]) + 1
+    return rect_min, rect_max - rect_min
+
+
+def walk(line_mask: np.ndarray, start: int, direction: int) -> int:
+    """returns the last index from start on in a direction (1 or -1) that is still set in the line mask"""
+    line = line_mask[start::direction]
+    gaps = np.flatnonzero(~line)
+    run_length = gaps[0] if len(gaps) > 0 else len(line)
+    return start + direction * (run_length - 1)
+
+
+def find_square_count(im_array: np.ndarray, game_rect: Tuple[np.ndarray, np.ndarray], colors: List[Color], thresh) -> np.ndarray:
+    """finds the number of squares along x and y by counting the color changes along the first row and column of the game"""
+    x, y = game_rect[0]
+    w, h = game_rect[1]
+    row_classes = get_color_classes(im_array[y, x:x + w], colors, thresh)
+    column_classes = get_color_classes(im_array[y:y + h, x], colors, thresh)
+    return np.array([count_color_switches(row_classes), count_color_switches(column_classes)])
+
+
+def count_color_switches(classes: np.ndarray) -> int:
+    """counts the runs of equal color classes in a line, ignoring pixels without a square color"""
+    classes = classes[classes != -1]
+    if len(classes) == 0:
+        return 0
+    return 1 + int(np.count_nonzero(np.diff(classes)))
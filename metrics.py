@@ -0,0 +1,170 @@
+from typing import Dict, List, Optional
+import json
+import threading
+import time
+
+# upper bounds in seconds of the histogram buckets, like the default buckets of prometheus clients
+BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+
+
+class Histogram:
+    """counts durations into cumulative buckets and keeps their sum"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, duration: float):
+        self.count += 1
+        self.sum += duration
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                self.bucket_counts[i] += 1
+
+
+class Span:
+    """times a phase of a turn, used as a context manager"""
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_duration(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class NullSpan:
+    """does nothing, returned by disabled metrics so instrumented code doesn't have to check"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Metrics:
+    """collects the time spent per phase and counts per turn.
+    every finished turn is appended as a json line, the totals can be written as a prometheus text snapshot.
+    while disabled, spans and counts cost a single attribute check"""
+
+    def __init__(self):
+        self.enabled = False
+        self.jsonl_path = None
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.turn_count = 0
+        self._turn_durations: Dict[str, float] = {}
+        self._turn_counts: Dict[str, int] = {}
+        self._turn_start = 0.0
+        # input dispatch is timed from the action worker thread
+        self._lock = threading.Lock()
+
+    def enable(self, jsonl_path: Optional[str] = None):
+        self.enabled = True
+        self.jsonl_path = jsonl_path
+        self._turn_start = time.perf_counter()
+        if jsonl_path is not None:
+            open(jsonl_path, "w").close()
+
+    def span(self, name: str):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def add_duration(self, name: str, duration: float):
+        with self._lock:
+            self._turn_durations[name] = self._turn_durations.get(name, 0.0) + duration
+
+    def observe(self, name: str, duration: float):
+        """adds a duration to its histogram right away instead of summing it up per turn,
+        for things that happen many times per turn like solving a frontier component"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).observe(duration)
+
+    def count(self, name: str, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._turn_counts[name] = self._turn_counts.get(name, 0) + n
+
+    def end_turn(self):
+        """adds the durations and counts since the last turn to the totals and appends them to the json lines file"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            durations, self._turn_durations = self._turn_durations, {}
+            counts, self._turn_counts = self._turn_counts, {}
+        durations["turn"] = now - self._turn_start
+        self._turn_start = now
+        self.turn_count += 1
+
+        for name, duration in durations.items():
+            self.histograms.setdefault(name, Histogram()).observe(duration)
+        for name, n in counts.items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+        if self.jsonl_path is not None:
+            with open(self.jsonl_path, "a") as file:
+                record = {"turn": self.turn_count, "seconds": durations, "counts": counts}
+                file.write(json.dumps(record) + "\n")
+
+    def get_prometheus_text(self) -> str:
+        lines = [
+            "# HELP minesweeper_phase_seconds time spent per phase of a turn",
+            "# TYPE minesweeper_phase_seconds histogram"]
+        for name, histogram in sorted(self.histograms.items()):
+            for bound, n in zip(BUCKETS, histogram.bucket_counts):
+                lines.append(f'minesweeper_phase_seconds_bucket{{phase="{name}",le="{bound}"}} {n}')
+            lines.append(f'minesweeper_phase_seconds_bucket{{phase="{name}",le="+Inf"}} {histogram.count}')
+            lines.append(f'minesweeper_phase_seconds_sum{{phase="{name}"}} {histogram.sum:.6f}')
+            lines.append(f'minesweeper_phase_seconds_count{{phase="{name}"}} {histogram.count}')
+
+        lines.append("# HELP minesweeper_total things counted over all turns")
+        lines.append("# TYPE minesweeper_total counter")
+        for name, n in sorted(self.counters.items()):
+            lines.append(f'minesweeper_total{{name="{name}"}} {n}')
+        lines.append(f'minesweeper_total{{name="turns"}} {self.turn_count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        with open(path, "w") as file:
+            file.write(self.get_prometheus_text())
+
+    def get_summary(self) -> List[str]:
+        """returns one line per phase with its total and mean time (per turn or per observation), slowest first"""
+        return [f"{name:>15}: {1000 * h.sum:8.1f} ms total, {1000 * h.sum / h.count:6.2f} ms mean"
+                for name, h in sorted(self.histograms.items(), key=lambda item: -item[1].sum)]
+
+
+# shared by all modules, so the phases don't have to be passed through every function
+METRICS = Metrics()
+
+
+def span(name: str):
+    return METRICS.span(name)
+
+
+def observe(name: str, duration: float):
+    METRICS.observe(name, duration)
+
+
+def count(name: str, n=1):
+    METRICS.count(name, n)
+
+
+def end_turn():
+    METRICS.end_turn()
@@ -0,0 +1,98 @@
+from typing import Callable, Optional, List, TYPE_CHECKING
+from collections import OrderedDict
+import os
+import numpy as np
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+def get_fingerprint(im: "Image.Image", size=8, levels=16) -> bytes:
+    """returns a key for a square image that is the same for all images of the same number.
+    the image is downsampled and its colors quantized, so small offsets and noise don't matter"""
+    from PIL import Image
+    small = np.asarray(im.convert("RGB").resize((size, size), Image.BOX))
+    return (small // (256 // levels)).astype(np.uint8).tobytes()
+
+
+class OcrCache:
+    """remembers recognized numbers by the fingerprint of their square image, so tesseract
+    only has to read new appearances. least recently used entries are dropped when the cache is full.
+    with a path the entries are appended to a file and loaded again on the next start.
+    the file is rewritten with only the cached entries once it has twice as many lines as the cache can hold
+    or when it has lines that aren't cached"""
+
+    def __init__(self, max_size=1024, path: Optional[str] = None):
+        self.max_size = max_size
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # lines in the file, entries that were dropped or read again are in there more than once
+        self.file_lines = 0
+
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    # a line cut off by an interrupted run is skipped and dropped by the compaction
+                    self.file_lines += 1
+                    try:
+                        key, value = line.split()
+                        self._put(bytes.fromhex(key), int(value))
+                    except ValueError:
+                        continue
+            if self.file_lines > len(self.entries):
+                self._compact()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0
+
+    def get_many(self, images: List["Image.Image"], read_nums: Callable[[List["Image.Image"]], List[int]]) -> List[int]:
+        """returns the cached numbers of many square images. all unknown appearances are read together
+        with one call of read_nums, images with the same fingerprint are only read once"""
+        keys = [get_fingerprint(im) for im in images]
+        values = {}
+        new_images = {}
+        for key, im in zip(keys, images):
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                values[key] = self.entries[key]
+            elif key in new_images:
+                # the same appearance is read only once, the other images get its value
+                self.hits += 1
+            else:
+                self.misses += 1
+                new_images[key] = im
+
+        if len(new_images) > 0:
+            for key, value in zip(new_images, read_nums(list(new_images.values()))):
+                self._store(key, value)
+                values[key] = value
+        return [values[key] for key in keys]
+
+    def _store(self, key: bytes, value: int):
+        self._put(key, value)
+        if self.path is None:
+            return
+        if self.file_lines >= 2 * self.max_size:
+            self._compact()
+        else:
+            with open(self.path, "a") as file:
+                file.write(f"{key.hex()} {value}\n")
+            self.file_lines += 1
+
+    def _compact(self):
+        """rewrites the file with the cached entries, least recently used first like they are loaded"""
+        with open(self.path, "w") as file:
+            for key, value in self.entries.items():
+                file.write(f"{key.hex()} {value}\n")
+        self.file_lines = len(self.entries)
+
+    def _put(self, key: bytes, value: int):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
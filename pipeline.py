@@ -0,0 +1,258 @@
+import game
+import probability
+import capture
+import frame_cache
+import planner
+import settle
+import recording
+import metrics
+
+from typing import Dict, Tuple, Callable, Collection, Iterator, NamedTuple, Optional, Set
+import numpy as np
+import queue
+import threading
+import time
+
+Square = Tuple[int, int]
+
+
+class Actions(NamedTuple):
+    """the mouse actions of a bot, each taking the square to act on.
+    a planner.InputDispatcher or a simulator.SimulatedBoard can be used in its place"""
+    mark_mine: Callable[[Square], None]
+    reveal_neighbors: Callable[[Square], None]
+    reveal_square: Callable[[Square], None]
+
+
+class ActionWorker:
+    """issues mouse actions from a queue in its own thread, so the bot can keep reading the screen meanwhile.
+    measures the time from the frame that led to an action until the action is issued"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.latencies = []
+        # the exception of the first action that failed, later actions are dropped
+        self.error: Optional[Exception] = None
+        # when the last action was done, the screen shows its result some time later
+        self.last_action_time = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def put(self, action: Callable[[Square], None], square: Square, seen_time: float):
+        """queues an action, seen_time is when the squares that made the action possible were seen on the screen"""
+        self.queue.put((action, square, seen_time))
+
+    def is_idle(self) -> bool:
+        return self.queue.unfinished_tasks == 0
+
+    def stop(self):
+        self.queue.join()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        last_seen_time = None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            action, square, seen_time = item
+
+            try:
+                if self.error is not None:
+                    continue
+                # only the first click after new squares showed up is interesting
+                if seen_time != last_seen_time:
+                    self.latencies.append(time.perf_counter() - seen_time)
+                    last_seen_time = seen_time
+                with metrics.span("input"):
+                    action(square)
+            except Exception as error:
+                self.error = error
+            finally:
+                self.last_action_time = time.perf_counter()
+                self.queue.task_done()
+
+
+class SettledSquareReader:
+    """grabs the game rect and reads covered squares once they stopped changing between two frames,
+    so squares that are still being revealed are not misread"""
+
+    def __init__(
+            self,
+            screen: capture.Capture,
+            game_rect: Tuple[np.ndarray, np.ndarray],
+            square_count: np.ndarray,
+            read_values: Callable[[np.ndarray, Tuple[np.ndarray, np.ndarray], Collection[Square]], Dict[Square, int]],
+            recorder: Optional[recording.Recorder] = None,
+            reread_values: Optional[Callable[[np.ndarray, Tuple[np.ndarray, np.ndarray], Collection[Square]], Dict[Square, int]]] = None):
+        self.screen = screen
+        self.game_rect = game_rect
+        self.local_rect = capture.get_local_rect(game_rect)
+        self.square_count = square_count
+        self.read_values = read_values
+        # a slower but more reliable recognizer for squares that were probably misread
+        self.reread_values = reread_values if reread_values is not None else read_values
+        self.recorder = recorder
+        self.cache = frame_cache.FrameCache()
+        # squares that changed in the last frame
+        self.unsettled = set()
+
+    @property
+    def is_settled(self) -> bool:
+        return len(self.unsettled) == 0
+
+    def read(self, covered_squares: Collection[Square]) -> Dict[Square, int]:
+        im_array = self.screen.grab(self.game_rect)
+        if self.recorder is not None:
+            self.recorder.add_frame(im_array)
+        changed = set(self.cache.get_changed_squares(im_array, self.local_rect, self.square_count, covered_squares))
+        metrics.count("frame_cache_hits", self.cache.hits)
+        metrics.count("frame_cache_misses", self.cache.misses)
+        settled = [s for s in self.unsettled if s not in changed and s in covered_squares]
+        self.unsettled = changed
+
+        if len(settled) == 0:
+            return {}
+        print(f"grabbed frame in {1000 * self.screen.last_latency:.1f} ms, {self.cache.misses} squares changed, {self.cache.hits} unchanged")
+        new_values = self.read_values(im_array, self.local_rect, settled)
+        if self.recorder is not None:
+            self.recorder.add_values(new_values)
+        return new_values
+
+    def reread(self, squares: Collection[Square]) -> Dict[Square, int]:
+        """reads revealed squares of a new frame again. squares that are covered on it are returned as COVERED,
+        so a covered square that was misread as a number is covered again in the game"""
+        im_array = self.screen.grab(self.game_rect)
+        if self.recorder is not None:
+            self.recorder.add_frame(im_array)
+        read_values = self.reread_values(im_array, self.local_rect, squares)
+        new_values = {square: read_values.get(square, game.COVERED) for square in squares}
+        if self.recorder is not None:
+            self.recorder.add_values(new_values)
+        return new_values
+
+
+def run_pipeline(
+        my_game: game.Game,
+        actions: Actions,
+        reader: SettledSquareReader,
+        mine_count: Optional[int] = None,
+        poll_interval=0.02,
+        plan=True,
+        detector: Optional[settle.SettleDetector] = None):
+    """plays the game by issuing moves as soon as they are found while the screen keeps being read.
+    with plan the moves of a turn are ordered for a short cursor path first,
+    without it every move goes to the mouse as soon as Game.iter_moves found it.
+    with a detector the bot waits for the results of its last moves to show up before it guesses or stops.
+    returns when the game is solved or the bot would have to guess and the screen doesn't change anymore"""
+    worker = ActionWorker()
+    guesser = probability.ProbabilitySolver()
+    # moves that were already issued, their results take some time to show up on the screen
+    issued_moves = set()
+    last_guess = None
+    cursor_square = (0, 0)
+    seen_time = time.perf_counter()
+    # squares that were read again because of a contradiction
+    reread_squares = set()
+    # squares of the moves whose results might not be on the screen yet
+    pending_squares = set()
+
+    while True:
+        if worker.error is not None:
+            print(f"a mouse action failed, stopping: {worker.error!r}")
+            break
+        reread_misread_squares(my_game, reader, reread_squares)
+        if plan:
+            with metrics.span("solve"):
+                moves = planner.plan_moves(get_moves(my_game, issued_moves), my_game, cursor_square)
+        else:
+            moves = time_moves(my_game.iter_moves(issued_moves))
+        move_count = 0
+        for action_name, square in moves:
+            issued_moves.add((action_name, square))
+            worker.put(getattr(actions, action_name), square, seen_time)
+            cursor_square = square
+            pending_squares.add(square)
+            move_count += 1
+            if reader.recorder is not None:
+                reader.recorder.add_action(action_name, square)
+        metrics.count("moves", move_count)
+
+        if move_count == 0 and worker.is_idle() and reader.is_settled:
+            # give the screen a last chance to show the results of the last clicks
+            if detector is not None and len(pending_squares) > 0:
+                with metrics.span("settle"):
+                    detector.wait_for_quiet(pending_squares, worker.last_action_time)
+                pending_squares.clear()
+                continue
+            new_values = reader.read(my_game.covered_squares)
+            if not reader.is_settled or len(new_values) > 0:
+                my_game.update(new_values)
+                continue
+
+            if len(my_game.covered_squares) == 0 or len(my_game.covered_squares) + len(my_game.flagged_mines) == mine_count:
+                print("I hope this was it uwu")
+                break
+            if last_guess in my_game.covered_squares:
+                print("the last guess didn't reveal anything, the game seems to be over")
+                break
+            with metrics.span("solve"):
+                guess, risk = guesser.find_safest_square(my_game, mine_count)
+            metrics.count("moves")
+            metrics.count("guesses")
+            print(f"nothing certain to click, guessing {guess} with a {risk:.0%} chance of a mine")
+            issued_moves.add(("reveal_square", guess))
+            last_guess = guess
+            cursor_square = guess
+            pending_squares.add(guess)
+            worker.put(actions.reveal_square, guess, seen_time)
+            if reader.recorder is not None:
+                reader.recorder.add_action("reveal_square", guess)
+
+        time.sleep(poll_interval)
+        new_values = reader.read(my_game.covered_squares)
+        if len(new_values) > 0:
+            seen_time = time.perf_counter()
+            with metrics.span("update"):
+                my_game.update(new_values)
+            # a turn ends with every frame that brought new squares
+            metrics.end_turn()
+
+    worker.stop()
+    if len(worker.latencies) > 0:
+        print(f"time from seeing squares to the next click: mean {1000 * np.mean(worker.latencies):.1f} ms, "
+              f"max {1000 * np.max(worker.latencies):.1f} ms")
+
+
+def reread_misread_squares(my_game: game.Game, reader: SettledSquareReader, reread_squares: Set[Square]):
+    """reads the squares around numbers that contradict their neighbors again, instead of the whole board.
+    every square is read again once per contradiction, a square that is still wrong isn't read over and over"""
+    if len(my_game.inconsistent_squares) == 0:
+        reread_squares.clear()
+        return
+    squares = my_game.get_reread_squares() - reread_squares
+    if len(squares) == 0:
+        return
+    reread_squares.update(squares)
+    with metrics.span("reread"):
+        new_values = reader.reread(squares)
+    metrics.count("cells_reread", len(squares))
+    my_game.update(new_values)
+
+
+def time_moves(moves: Iterator[Tuple[str, Square]], name="solve") -> Iterator[Tuple[str, Square]]:
+    """yields the moves of a generator and times the work it does for every move as a span,
+    without the time the moves take to be issued in between"""
+    while True:
+        with metrics.span(name):
+            move = next(moves, None)
+        if move is None:
+            return
+        yield move
+
+
+def get_moves(my_game: game.Game, issued_moves: Collection[Tuple[str, Square]]):
+    """returns the next certain moves as (action name, square) pairs, skipping moves that were already issued.
+    the mines to flag are added to the game right away"""
+    return list(my_game.iter_moves(issued_moves))
@@ -0,0 +1,208 @@
+import game
+
+from typing import Tuple, List, Optional
+import numpy as np
+import time
+
+Square = Tuple[int, int]
+Move = Tuple[str, Square]
+
+
+def get_distance(a: Square, b: Square) -> float:
+    return ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5
+
+
+def get_dependencies(moves: List[Move]) -> List[set]:
+    """returns for every move the indices of the flags it has to wait for.
+    a chord only reveals the neighbors once all mines around it are flagged"""
+    flag_indices = {square: i for i, (action_name, square) in enumerate(moves) if action_name == "mark_mine"}
+    dependencies = []
+    for action_name, (x, y) in moves:
+        if action_name != "reveal_neighbors":
+            dependencies.append(set())
+            continue
+        neighbors = [(x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx != 0 or dy != 0]
+        dependencies.append(set(flag_indices[s] for s in neighbors if s in flag_indices))
+    return dependencies
+
+
+def can_reverse(segment: List[int], dependencies: List[set]) -> bool:
+    """moves outside of a reversed segment keep their order to it,
+    so only a move depending on another move of the segment would break"""
+    segment_moves = set(segment)
+    return all(len(dependencies[move] & segment_moves) == 0 for move in segment)
+
+
+def order_moves(moves: List[Move], start: Square, max_passes=10, window=30, max_2opt_moves=400) -> List[Move]:
+    """orders moves to keep the cursor travel short: nearest neighbor first, then improved with 2-opt.
+    2-opt only reverses segments of up to window moves and is skipped for more than max_2opt_moves moves,
+    the nearest neighbor order is good enough there and 2-opt would take too long.
+    chords always stay behind the flags around them"""
+    dependencies = get_dependencies(moves)
+    squares = np.array([square for _, square in moves], dtype=float).reshape(-1, 2)
+    # how many flags every move still waits for and which moves wait for each flag
+    waiting_counts = np.array([len(d) for d in dependencies])
+    dependents = [[] for _ in moves]
+    for move, move_dependencies in enumerate(dependencies):
+        for d in move_dependencies:
+            dependents[d].append(move)
+    order = []
+    position = np.array(start, dtype=float)
+
+    while len(order) < len(moves):
+        distances = np.hypot(*(squares - position).T)
+        distances[waiting_counts != 0] = np.inf
+        nearest = int(distances.argmin())
+        order.append(nearest)
+        # done moves are never ready again
+        waiting_counts[nearest] = -1
+        for move in dependents[nearest]:
+            waiting_counts[move] -= 1
+        position = squares[nearest]
+
+    if len(order) > max_2opt_moves:
+        return [moves[i] for i in order]
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(len(order) - 1):
+            for j in range(i + 2, min(i + window, len(order)) + 1):
+                # reversing order[i:j] only changes the edges at both ends of the segment
+                before = moves[order[i - 1]][1] if i > 0 else start
+                first, last = moves[order[i]][1], moves[order[j - 1]][1]
+                old_length = get_distance(before, first)
+                new_length = get_distance(before, last)
+                if j < len(order):
+                    after = moves[order[j]][1]
+                    old_length += get_distance(last, after)
+                    new_length += get_distance(first, after)
+
+                if new_length < old_length - 1e-9 and can_reverse(order[i:j], dependencies):
+                    order[i:j] = order[i:j][::-1]
+                    improved = True
+        if not improved:
+            break
+    return [moves[i] for i in order]
+
+
+def drop_redundant_moves(moves: List[Move], my_game: game.Game) -> List[Move]:
+    """drops chords and reveals of squares that earlier chords in the list already reveal"""
+    revealed = set()
+    kept_moves = []
+    for action_name, square in moves:
+        if action_name == "reveal_neighbors":
+            targets = my_game.get_covered_neighbors(square)
+            if targets <= revealed:
+                continue
+            revealed.update(targets)
+        elif action_name == "reveal_square":
+            if square in revealed:
+                continue
+            revealed.add(square)
+        kept_moves.append((action_name, square))
+    return kept_moves
+
+
+def plan_moves(moves: List[Move], my_game: game.Game, start: Square) -> List[Move]:
+    """orders moves for short cursor travel and drops the ones made redundant by earlier chords"""
+    if len(moves) == 0:
+        return moves
+    return drop_redundant_moves(order_moves(moves, start), my_game)
+
+
+class MockController:
+    """stands in for a pynput mouse controller and records what it was told to do"""
+
+    def __init__(self):
+        self.position = (0, 0)
+        self.events = []
+
+    def press(self, button):
+        self.events.append(("press", button, self.position))
+
+    def release(self, button):
+        self.events.append(("release", button, self.position))
+
+    def click(self, button):
+        self.events.append(("click", button, self.position))
+
+
+class InputDispatcher:
+    """issues mouse actions through one persistent controller and at most rate_limit actions per second.
+    in dry run mode nothing is clicked and nothing waits, instead travel distance and time are added up"""
+
+    def __init__(
+            self,
+            game_rect: Tuple[np.ndarray, np.ndarray],
+            square_count: np.ndarray,
+            delay=0.05,
+            rate_limit: Optional[float] = None,
+            dry_run=False,
+            launch_time: Optional[float] = None):
+        self.game_rect = game_rect
+        self.square_count = square_count
+        self.delay = delay
+        self.min_interval = 1 / rate_limit if rate_limit else 0
+        self.dry_run = dry_run
+        # the time.perf_counter() the bot was started at, the time to the first action is printed once it's issued
+        self.launch_time = launch_time
+
+        if dry_run:
+            self.mouse = MockController()
+            self.left, self.right = "left", "right"
+        else:
+            from pynput.mouse import Button, Controller
+            self.mouse = Controller()
+            self.left, self.right = Button.left, Button.right
+
+        # pixels the cursor moved and the time all actions took (or would take in a dry run)
+        self.travel_distance = 0
+        self.action_time = 0
+        self.action_count = 0
+        self._last_action_time = None
+
+    def mark_mine(self, square: Square):
+        """marks a square as a mine by right clicking it"""
+        self._start_action()
+        self.move_to_square(square)
+        self.mouse.click(self.right)
+
+    def reveal_neighbors(self, square: Square):
+        """reveals all left neighbors of a fully flagged square by left-right clicking it"""
+        self._start_action()
+        self.move_to_square(square)
+        self.mouse.press(self.left)
+        self._sleep(self.delay)
+        self.mouse.press(self.right)
+        self._sleep(self.delay)
+        self.mouse.release(self.right)
+        self.mouse.release(self.left)
+        self._sleep(self.delay)
+
+    def reveal_square(self, square: Square):
+        """reveals a covered square by left clicking it"""
+        self._start_action()
+        self.move_to_square(square)
+        self.mouse.click(self.left)
+
+    def move_to_square(self, square: Square):
+        """moves the mouse to the center position of a square"""
+        pixel_pos = self.game_rect[0] + (np.array(square) + np.array([0.5, 0.5])) / self.square_count * self.game_rect[1]
+        self.travel_distance += float(np.linalg.norm(pixel_pos - np.array(self.mouse.position)))
+        self.mouse.position = tuple(pixel_pos)
+        self._sleep(2 * self.delay)
+
+    def _start_action(self):
+        """waits until the rate limit allows the next action"""
+        self.action_count += 1
+        if self.action_count == 1 and self.launch_time is not None:
+            print(f"first action after {1000 * (time.perf_counter() - self.launch_time):.0f} ms since launch")
+        if self._last_action_time is not None:
+            elapsed = (self.action_time if self.dry_run else time.perf_counter()) - self._last_action_time
+            self._sleep(max(0, self.min_interval - elapsed))
+        self._last_action_time = self.action_time if self.dry_run else time.perf_counter()
+
+    def _sleep(self, duration: float):
+        self.action_time += duration
+        if not self.dry_run:
+            time.sleep(duration)
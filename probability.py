@@ -0,0 +1,249 @@
+import game
+import solver
+
+from typing import Dict, Tuple, List, Optional
+from collections import OrderedDict, defaultdict
+from math import lgamma, log, exp
+
+Square = Tuple[int, int]
+
+
+class ComponentStats:
+    """summed up valid mine assignments of one frontier component, grouped by their number of mines.
+    solution_counts[m] is the number of assignments with m mines,
+    mine_counts[m][i] how many of them have a mine on cells[i]"""
+
+    def __init__(self, cells: List[Square]):
+        self.cells = cells
+        self.solution_counts = defaultdict(int)
+        self.mine_counts = {}
+
+    def add_solution(self, mines_mask: int, weight=1):
+        mine_count = mines_mask.bit_count()
+        self.solution_counts[mine_count] += weight
+        counts = self.mine_counts.setdefault(mine_count, [0] * len(self.cells))
+        while mines_mask:
+            low_bit = mines_mask & -mines_mask
+            counts[low_bit.bit_length() - 1] += weight
+            mines_mask ^= low_bit
+
+
+def get_signature(constraints: List[solver.Constraint]) -> tuple:
+    """returns a key that is the same for equal components, no matter in which order the constraints were found"""
+    return tuple(sorted((tuple(sorted(cells)), mine_count) for cells, mine_count in constraints))
+
+
+def order_cells(constraints: List[solver.Constraint]) -> List[Square]:
+    """orders cells constraint by constraint, so backtracking closes constraints (and prunes) early"""
+    cells = []
+    seen = set()
+    for constraint_cells, _ in sorted(constraints, key=lambda c: sorted(c[0])):
+        for square in sorted(constraint_cells):
+            if square not in seen:
+                seen.add(square)
+                cells.append(square)
+    return cells
+
+
+def enumerate_component(constraints: List[solver.Constraint], max_nodes: Optional[int] = None) -> Optional[ComponentStats]:
+    """counts all valid mine assignments of a component by backtracking over bitsets.
+    returns None if more than max_nodes cells had to be assigned, the number of solutions can grow exponentially"""
+    cells = order_cells(constraints)
+    stats = ComponentStats(cells)
+    index = {square: i for i, square in enumerate(cells)}
+
+    masks = []
+    for constraint_cells, mine_count in constraints:
+        mask = 0
+        for square in constraint_cells:
+            mask |= 1 << index[square]
+        masks.append((mask, mine_count))
+    # constraints to check after a cell got assigned
+    cell_constraints = [[c for c in masks if c[0] >> i & 1] for i in range(len(cells))]
+
+    def is_valid(i, assigned, mines):
+        for mask, mine_count in cell_constraints[i]:
+            placed = (mines & mask).bit_count()
+            open_cells = (mask & ~assigned).bit_count()
+            if placed > mine_count or placed + open_cells < mine_count:
+                return False
+        return True
+
+    node_count = 0
+
+    def backtrack(i, assigned, mines) -> bool:
+        """returns False once the node budget is used up"""
+        nonlocal node_count
+        node_count += 1
+        if max_nodes is not None and node_count > max_nodes:
+            return False
+        if i == len(cells):
+            stats.add_solution(mines)
+            return True
+        assigned |= 1 << i
+        if is_valid(i, assigned, mines) and not backtrack(i + 1, assigned, mines):
+            return False
+        mines |= 1 << i
+        if is_valid(i, assigned, mines) and not backtrack(i + 1, assigned, mines):
+            return False
+        return True
+
+    if not backtrack(0, 0, 0):
+        return None
+    return stats
+
+
+def approximate_component(constraints: List[solver.Constraint]) -> ComponentStats:
+    """estimates mine probabilities of a component too large to enumerate
+    by averaging the mine density of all constraints a cell is part of"""
+    densities = defaultdict(list)
+    for cells, mine_count in constraints:
+        for square in cells:
+            densities[square].append(mine_count / len(cells))
+
+    cells = order_cells(constraints)
+    stats = ComponentStats(cells)
+    probabilities = [sum(densities[s]) / len(densities[s]) for s in cells]
+    expected_mines = round(sum(probabilities))
+    stats.solution_counts[expected_mines] = 1
+    stats.mine_counts[expected_mines] = probabilities
+    return stats
+
+
+def convolve(a: Dict[int, float], b: Dict[int, float]) -> Dict[int, float]:
+    """combines two mine count distributions of independent components"""
+    result = defaultdict(int)
+    for mines_a, count_a in a.items():
+        for mines_b, count_b in b.items():
+            result[mines_a + mines_b] += count_a * count_b
+    return result
+
+
+def convolve_all(distributions: List[Dict[int, float]]) -> Tuple[Dict[int, float], float]:
+    """combines many mine count distributions. the result is scaled to a largest count of 1 after every step,
+    so products of many components don't overflow floats. returns it with the log of the removed scale"""
+    result = {0: 1.0}
+    log_scale = 0.0
+    for distribution in distributions:
+        result = convolve(result, distribution)
+        largest = max(result.values(), default=0)
+        if largest > 0:
+            result = {m: count / largest for m, count in result.items()}
+            log_scale += log(largest)
+    return result, log_scale
+
+
+def get_log_comb(n: int, k: int) -> float:
+    return lgamma(n + 1) - lgamma(k + 1) - lgamma(n - k + 1)
+
+
+def normalize(stats: ComponentStats) -> Tuple[Dict[int, float], Dict[int, List[float]]]:
+    """returns the solution and mine counts of a component divided by its largest solution count.
+    the exact counts are python ints that can be too large for floats, only their ratios matter"""
+    largest = max(stats.solution_counts.values(), default=1) or 1
+    solution_counts = {m: count / largest for m, count in stats.solution_counts.items()}
+    mine_counts = {m: [count / largest for count in counts] for m, counts in stats.mine_counts.items()}
+    return solution_counts, mine_counts
+
+
+class ProbabilitySolver:
+    """calculates the mine probability of every covered square to find the least risky guess.
+    components are cached by their signature, so unchanged ones aren't enumerated again between moves"""
+
+    def __init__(self, max_component_cells=24, max_nodes=20000, cache_size=256):
+        # larger components are approximated right away. the cell count alone doesn't bound the latency,
+        # so components whose enumeration takes more than max_nodes steps are approximated as well
+        self.max_component_cells = max_component_cells
+        self.max_nodes = max_nodes
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def get_component_stats(self, constraints: List[solver.Constraint]) -> ComponentStats:
+        signature = get_signature(constraints)
+        if signature in self.cache:
+            self.cache_hits += 1
+            self.cache.move_to_end(signature)
+            return self.cache[signature]
+
+        self.cache_misses += 1
+        cell_count = len(set().union(*(cells for cells, _ in constraints)))
+        stats = None
+        if cell_count <= self.max_component_cells:
+            stats = enumerate_component(constraints, self.max_nodes)
+        if stats is None:
+            stats = approximate_component(constraints)
+
+        self.cache[signature] = stats
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return stats
+
+    def get_probabilities(self, my_game: game.Game, mine_count: Optional[int] = None) -> Tuple[Dict[Square, float], Optional[float]]:
+        """returns the mine probabilities of the frontier squares and the probability for any other covered square.
+        without a total mine count all frontier assignments are weighted equally and the other squares are unknown (None)"""
+        components = [self.get_component_stats(c) for c in solver.split_components(solver.get_frontier_constraints(my_game))]
+        frontier = set(s for stats in components for s in stats.cells)
+        other_count = len(my_game.covered_squares) - len(frontier)
+        normalized = [normalize(stats) for stats in components]
+        total, total_log_scale = convolve_all([solution_counts for solution_counts, _ in normalized])
+
+        # the number of ways to place the left mines on the other squares, relative to the most likely frontier mine count.
+        # the binomials themselves are far too large for floats on big boards
+        log_combs = {}
+        if mine_count is not None:
+            for m in total:
+                left_mines = mine_count - len(my_game.flagged_mines) - m
+                if 0 <= left_mines <= other_count:
+                    log_combs[m] = get_log_comb(other_count, left_mines)
+        max_log_comb = max(log_combs.values(), default=0)
+
+        def weight(frontier_mines):
+            if mine_count is None:
+                return 1
+            if frontier_mines not in log_combs:
+                return 0
+            return exp(log_combs[frontier_mines] - max_log_comb)
+
+        total_weight = sum(count * weight(m) for m, count in total.items())
+
+        if total_weight == 0:
+            # misread numbers or a wrong mine count, nothing consistent left
+            return {}, None
+
+        probabilities = {}
+        for i, stats in enumerate(components):
+            others, others_log_scale = convolve_all([solution_counts for solution_counts, _ in normalized[:i] + normalized[i + 1:]])
+            # total and others were scaled differently while they were convolved
+            scale = exp(others_log_scale - total_log_scale)
+
+            cell_weights = [0] * len(stats.cells)
+            for m, mine_counts in normalized[i][1].items():
+                other_weight = sum(count * weight(m + m_other) for m_other, count in others.items())
+                for j, count in enumerate(mine_counts):
+                    cell_weights[j] += count * other_weight
+
+            for square, cell_weight in zip(stats.cells, cell_weights):
+                probabilities[square] = cell_weight * scale / total_weight
+
+        other_probability = None
+        if mine_count is not None and other_count > 0:
+            expected_other_mines = sum(
+                count * weight(m) * (mine_count - len(my_game.flagged_mines) - m) for m, count in total.items())
+            other_probability = expected_other_mines / total_weight / other_count
+        return probabilities, other_probability
+
+    def find_safest_square(self, my_game: game.Game, mine_count: Optional[int] = None) -> Tuple[Square, float]:
+        """returns the covered square with the lowest mine probability and its probability"""
+        probabilities, other_probability = self.get_probabilities(my_game, mine_count)
+        candidates = list(probabilities.items())
+
+        if other_probability is not None or len(candidates) == 0:
+            # all squares away from the frontier are equally risky, prefer corners and edges
+            # because with less neighbors they more likely open up a zero
+            others = [s for s in my_game.covered_squares if s not in probabilities]
+            if len(others) > 0:
+                square = min(others, key=lambda s: len(my_game.get_neighbor_squares(s)))
+                candidates.append((square, other_probability if other_probability is not None else 1))
+        return min(candidates, key=lambda c: c[1])
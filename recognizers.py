@@ -0,0 +1,231 @@
+import game
+import grid
+import ocr_cache
+import template_bank
+import metrics
+
+from abc import ABC, abstractmethod
+from typing import Dict, Tuple, Collection, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+import numpy as np
+
+Square = Tuple[int, int]
+
+
+class Recognizer(ABC):
+    """reads the values of squares from a frame. squares that are still covered are left out of the result,
+    updating the game with them wouldn't change anything"""
+    name = ""
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    @abstractmethod
+    def read(
+            self,
+            im_array: np.ndarray,
+            game_rect: Tuple[np.ndarray, np.ndarray],
+            square_count: np.ndarray,
+            squares: Collection[Square]) -> Dict[Square, int]:
+        """returns the values of the revealed squares among squares"""
+
+
+class TesseractRecognizer(Recognizer):
+    """classifies the squares by their mean color and reads the numbers with tesseract.
+    read numbers are cached by their appearance on disk, so after a few games tesseract is barely needed anymore"""
+    name = "tesseract"
+
+    def __init__(self, grass_colors, dirt_colors, thresh, cache_path: Optional[str] = "ocr_cache.txt"):
+        self.grass_colors = grass_colors
+        self.dirt_colors = dirt_colors
+        self.thresh = thresh
+        self.number_cache = ocr_cache.OcrCache(path=cache_path)
+
+    @classmethod
+    def is_available(cls) -> bool:
+        try:
+            get_tesseract().get_tesseract_version()
+            return True
+        except Exception:
+            return False
+
+    def read(self, im_array, game_rect, square_count, squares):
+        square_size = game_rect[1] / square_count
+        square_values = {}
+
+        padding = np.array([4, 4])
+        # classify all squares at once by their average color, only numbers need to be read
+        with metrics.span("classify"):
+            square_classes = grid.classify_squares(im_array, game_rect, square_count, self.grass_colors, self.dirt_colors, self.thresh, padding[0])
+        # only revealed squares are turned into tuples, which matters on boards with millions of squares
+        read_mask = game.get_square_mask(squares, square_classes.shape)
+        number_squares = np.argwhere(read_mask & (square_classes == grid.NUMBER)).tolist()
+
+        for square in np.argwhere(read_mask & (square_classes == grid.ZERO)).tolist():
+            square_values[tuple(square)] = grid.ZERO
+
+        # PIL is only imported once there are numbers to read
+        from PIL import Image
+        square_ims = []
+        for square in number_squares:
+            square_min = game_rect[0] + square * square_size + padding
+            square_max = game_rect[0] + (np.array(square) + 1) * square_size - padding
+            x0, y0 = np.round(square_min).astype(int)
+            x1, y1 = np.round(square_max).astype(int)
+            square_ims.append(Image.fromarray(im_array[y0:y1, x0:x1, :3]))
+
+        # all new number appearances are read with one tesseract call
+        hits, misses = self.number_cache.hits, self.number_cache.misses
+        with metrics.span("digits"):
+            numbers = self.number_cache.get_many(square_ims, read_square_nums)
+        for square, value in zip(number_squares, numbers):
+            square_values[tuple(square)] = value
+        metrics.count("cells_read", int(np.count_nonzero(read_mask)))
+        metrics.count("cells_ocr", self.number_cache.misses - misses)
+        metrics.count("ocr_cache_hits", self.number_cache.hits - hits)
+
+        if len(number_squares) > 0:
+            print(f"ocr cache hit rate {self.number_cache.hit_rate:.0%} ({len(self.number_cache.entries)} known appearances)")
+        return square_values
+
+
+class TemplateRecognizer(Recognizer):
+    """compares all squares to the number templates of the template bank at once"""
+    name = "templates"
+
+    def __init__(self, bank_path=template_bank.BANK_PATH):
+        self.bank = template_bank.TemplateBank(bank_path)
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return os.path.exists(template_bank.NUMBERS_PATH) or os.path.exists(template_bank.BANK_PATH)
+
+    def read(self, im_array, game_rect, square_count, squares):
+        squares = np.array([tuple(s) for s in squares]).reshape(-1, 2)
+        if len(squares) == 0:
+            return {}
+
+        with metrics.span("digits"):
+            values = self.bank.read(np.asarray(im_array), game_rect, square_count, squares)
+        metrics.count("cells_read", len(squares))
+        return {tuple(square): int(value) for square, value in zip(squares.tolist(), values) if value != game.COVERED}
+
+
+def get_tesseract():
+    """imports pytesseract when the first number has to be read. it's slow to import and not needed for cached numbers"""
+    import pytesseract as tess
+    import config
+    tess.pytesseract.tesseract_cmd = config.TESSERACT_EXE_PATH
+    return tess
+
+
+def read_square_num(im) -> int:
+    # psm 10: single character? doesnt work
+    # oem 3: sets the OCR engine mode to use default OCR engine?
+    # c tessedit_char_whitelist=0123456789: restricts to 0 - 9?
+    text = get_tesseract().image_to_string(im, config='--psm 10 --oem 3 -c tessedit_char_whitelist=0123456789')
+    text = text.strip()
+    if text != "":
+        return int(text)
+    return 0
+
+
+def read_square_nums(ims: List["Image.Image"]) -> List[int]:
+    """reads many square images with a single tesseract call by placing them next to each other in one strip.
+    the recognized digits are mapped back to the squares by their x position,
+    squares where nothing was found are read again one by one in a thread pool"""
+    from PIL import Image
+    slot_w = max(im.width for im in ims) * 2
+    slot_h = max(im.height for im in ims)
+    background = ims[0].getpixel((0, 0))
+    strip = Image.new("RGB", (slot_w * len(ims), slot_h * 2), background)
+    for i, im in enumerate(ims):
+        strip.paste(im, (i * slot_w + slot_w // 4, slot_h // 2))
+
+    values = [None] * len(ims)
+    boxes = get_tesseract().image_to_boxes(strip, config='--psm 7 --oem 3 -c tessedit_char_whitelist=0123456789')
+    for line in boxes.splitlines():
+        char, left, _, right, _, _ = line.split()
+        slot = (int(left) + int(right)) // 2 // slot_w
+        if char.isdigit() and 0 <= slot < len(ims) and values[slot] is None:
+            values[slot] = int(char)
+
+    missing = [i for i, value in enumerate(values) if value is None]
+    if len(missing) > 0:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            for i, value in zip(missing, pool.map(read_square_num, [ims[i] for i in missing])):
+                values[i] = value
+    return values
+
+
+def create_recognizers(grass_colors, dirt_colors, thresh, name="auto") -> List[Recognizer]:
+    """creates the recognizers that can run here, most trusted first. with a name only that one"""
+    recognizers = []
+    if name in ("auto", TesseractRecognizer.name) and TesseractRecognizer.is_available():
+        recognizers.append(TesseractRecognizer(grass_colors, dirt_colors, thresh))
+    if name in ("auto", TemplateRecognizer.name) and TemplateRecognizer.is_available():
+        recognizers.append(TemplateRecognizer())
+    return recognizers
+
+
+def select_recognizer(
+        recognizers: List[Recognizer],
+        im_array: np.ndarray,
+        game_rect: Tuple[np.ndarray, np.ndarray],
+        square_count: np.ndarray,
+        min_accuracy=0.98) -> Tuple[Recognizer, Dict[Square, int]]:
+    """reads all squares of a frame with every recognizer and returns the fastest one (with its values)
+    that agrees with the others on at least min_accuracy of the squares.
+    where recognizers disagree the majority counts, ties go to the one listed first"""
+    squares = game.SquareSet(square_count, fill=True)
+    results = []
+    for recognizer in recognizers:
+        start = time.perf_counter()
+        values = recognizer.read(im_array, game_rect, square_count, squares)
+        results.append((recognizer, values, (time.perf_counter() - start) / len(squares)))
+
+    all_values = np.full((len(results), len(squares)), game.COVERED, dtype=np.int8)
+    for i, (_, values, _) in enumerate(results):
+        for j, square in enumerate(squares):
+            all_values[i, j] = values.get(square, game.COVERED)
+    votes = (all_values[:, None, :] == all_values[None, :, :]).sum(axis=1)
+    # argmax picks the first of equally voted recognizers
+    reference = all_values[np.argmax(votes, axis=0), np.arange(len(squares))]
+    harvest_templates(results, all_values, reference, im_array, game_rect, square_count, squares)
+
+    best = None
+    for i, (recognizer, values, latency) in enumerate(results):
+        accuracy = np.mean(all_values[i] == reference)
+        print(f"{recognizer.name:>10}: {1000 * latency:.3f} ms per square, agrees on {accuracy:.1%} of the squares")
+        if accuracy >= min_accuracy and (best is None or latency < best[2]):
+            best = (recognizer, values, latency)
+    if best is None:
+        best = results[0]
+    return best[0], best[1]
+
+
+def harvest_templates(
+        results: List[Tuple[Recognizer, Dict[Square, int], float]],
+        all_values: np.ndarray,
+        reference: np.ndarray,
+        im_array: np.ndarray,
+        game_rect: Tuple[np.ndarray, np.ndarray],
+        square_count: np.ndarray,
+        squares: Collection[Square]):
+    """adds the revealed squares that tesseract read like the majority to the template banks,
+    so the templates learn how the numbers look on this screen"""
+    confirmed = np.zeros(len(reference), dtype=bool)
+    for i, (recognizer, _, _) in enumerate(results):
+        if isinstance(recognizer, TesseractRecognizer):
+            confirmed |= all_values[i] == reference
+    confirmed &= reference != game.COVERED
+    if not confirmed.any():
+        return
+
+    squares = np.array([tuple(s) for s in squares]).reshape(-1, 2)
+    for recognizer, _, _ in results:
+        if isinstance(recognizer, TemplateRecognizer):
+            recognizer.bank.harvest(im_array, game_rect, square_count, squares[confirmed], reference[confirmed])
@@ -0,0 +1,153 @@
+import game
+import capture
+
+from typing import Dict, Tuple, Callable, Collection, Iterator
+import numpy as np
+import json
+import struct
+import time
+
+Square = Tuple[int, int]
+
+MAGIC = b"MSREC1\n"
+# record type, payload length, timestamp
+RECORD_HEADER = struct.Struct("<cId")
+# full frame height and width, position and size of the changed box
+FRAME_HEADER = struct.Struct("<6I")
+
+
+class Recorder:
+    """appends the frames, recognized values and actions of a run to a file.
+    frames are stored as the uint8 box of pixels that changed since the previous frame"""
+
+    def __init__(self, path: str, game_rect: Tuple[np.ndarray, np.ndarray], square_count: np.ndarray):
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.last_frame = None
+        self._write_json(b"M", {"game_rect": [game_rect[0].tolist(), game_rect[1].tolist()], "square_count": np.asarray(square_count).tolist()})
+
+    def add_frame(self, im_array: np.ndarray):
+        im_array = np.ascontiguousarray(im_array[:, :, :3], dtype=np.uint8)
+        h, w = im_array.shape[:2]
+
+        if self.last_frame is None or self.last_frame.shape != im_array.shape:
+            y0, x0, y1, x1 = 0, 0, h, w
+        else:
+            changed = np.argwhere((im_array != self.last_frame).any(axis=2))
+            if len(changed) == 0:
+                y0, x0, y1, x1 = 0, 0, 0, 0
+            else:
+                (y0, x0), (y1, x1) = changed.min(axis=0), changed.max(axis=0) + 1
+        self.last_frame = im_array
+
+        box = np.ascontiguousarray(im_array[y0:y1, x0:x1])
+        self._write(b"F", FRAME_HEADER.pack(h, w, y0, x0, y1 - y0, x1 - x0) + box.tobytes())
+
+    def add_values(self, new_values: Dict[Square, int]):
+        self._write_json(b"V", [[int(x), int(y), int(v)] for (x, y), v in new_values.items()])
+
+    def add_action(self, action_name: str, square: Square):
+        self._write_json(b"A", [action_name, [int(square[0]), int(square[1])]])
+
+    def close(self):
+        self.file.close()
+
+    def _write_json(self, record_type: bytes, data):
+        self._write(record_type, json.dumps(data).encode())
+
+    def _write(self, record_type: bytes, payload: bytes):
+        self.file.write(RECORD_HEADER.pack(record_type, len(payload), time.time()))
+        self.file.write(payload)
+        self.file.flush()
+
+
+class Recording:
+    """reads a recording through a memory map, frame pixels are not copied until a frame is rebuilt"""
+
+    def __init__(self, path: str):
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self.data[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a recording")
+
+        meta = next(self._iter_records())
+        self.game_rect = tuple(np.array(v) for v in meta[2]["game_rect"])
+        self.square_count = np.array(meta[2]["square_count"])
+
+    def __iter__(self) -> Iterator[Tuple[str, float, object]]:
+        """yields ("frame", time, array), ("values", time, dict) and ("action", time, (name, square)) records"""
+        frame = None
+        for record_type, timestamp, data in self._iter_records():
+            if record_type == "F":
+                h, w, y0, x0, box_h, box_w = FRAME_HEADER.unpack(bytes(data[:FRAME_HEADER.size]))
+                if frame is None or frame.shape[:2] != (h, w):
+                    frame = np.zeros((h, w, 3), dtype=np.uint8)
+                else:
+                    frame = frame.copy()
+                frame[y0:y0 + box_h, x0:x0 + box_w] = data[FRAME_HEADER.size:].reshape((box_h, box_w, 3))
+                yield "frame", timestamp, frame
+            elif record_type == "V":
+                yield "values", timestamp, {(x, y): v for x, y, v in data}
+            elif record_type == "A":
+                yield "action", timestamp, (data[0], tuple(data[1]))
+
+    def _iter_records(self):
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= len(self.data):
+            record_type, length, timestamp = RECORD_HEADER.unpack(bytes(self.data[offset:offset + RECORD_HEADER.size]))
+            offset += RECORD_HEADER.size
+            payload = self.data[offset:offset + length]
+            offset += length
+
+            record_type = record_type.decode()
+            if record_type == "F":
+                yield record_type, timestamp, payload
+            else:
+                yield record_type, timestamp, json.loads(bytes(payload))
+
+
+def replay(
+        path: str,
+        read_values: Callable[[np.ndarray, Tuple[np.ndarray, np.ndarray], Collection[Square]], Dict[Square, int]]) -> game.Game:
+    """feeds the frames of a recording through a recognizer and a new Game instead of the screen.
+    squares are read by a pipeline.SettledSquareReader like in a live game, so only once they stopped changing,
+    and recorded flags are added to the game. prints how long recognition and updates took
+    and where the values differ from the recorded ones"""
+    # the pipeline imports this module for the recorder
+    import pipeline
+    recording = Recording(path)
+    local_rect = capture.get_local_rect(recording.game_rect)
+    my_game = game.Game(recording.square_count)
+    # the recorded frames are the game rect already. the capture's only frame is replaced by every new frame
+    screen = capture.ArrayCapture([None])
+    reader = pipeline.SettledSquareReader(screen, local_rect, my_game.size, read_values)
+
+    read_time = 0
+    update_time = 0
+    frame_count = 0
+    mismatches = 0
+    last_values = {}
+
+    for record_type, _, data in recording:
+        if record_type == "values":
+            # recorded values belong to the frame before them
+            mismatches += sum(1 for square, value in data.items() if square in last_values and last_values[square] != value)
+        elif record_type == "action":
+            action_name, square = data
+            if action_name == "mark_mine" and square in my_game.covered_squares:
+                my_game.add_flagged_mine(square)
+        if record_type != "frame":
+            continue
+
+        frame_count += 1
+        screen.frames[0] = data
+        start = time.perf_counter()
+        last_values = reader.read(my_game.covered_squares)
+        read_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        my_game.update(last_values)
+        update_time += time.perf_counter() - start
+
+    print(f"replayed {frame_count} frames: recognition {1000 * read_time:.1f} ms, updates {1000 * update_time:.1f} ms, "
+          f"{mismatches} squares read differently than recorded")
+    return my_game
@@ -0,0 +1,110 @@
+import simulator
+import benchmark
+
+from typing import Dict, List, Set
+from multiprocessing import Pool
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+
+def play_seed(task) -> Dict:
+    """plays one seeded game and returns its result as a json record. runs in the worker processes"""
+    name, size, mine_count, seed = task
+    board = simulator.SimulatedBoard(size, mine_count, seed)
+    result = simulator.play_game(board)
+    return {
+        "board": name,
+        "seed": seed,
+        "won": bool(result.won),
+        "moves": result.move_count,
+        "guesses": result.guess_count,
+        # microseconds keep the lines short
+        "decision_us": [round(1e6 * t) for t in result.decision_times],
+    }
+
+
+def load_results(path: str) -> List[Dict]:
+    """reads the results of earlier runs. a line cut off by an interrupted run is skipped"""
+    results = []
+    if not os.path.exists(path):
+        return results
+    with open(path) as file:
+        for line in file:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return results
+
+
+def get_done_seeds(results: List[Dict], name: str) -> Set[int]:
+    return set(r["seed"] for r in results if r["board"] == name)
+
+
+def summarize(results: List[Dict], name: str) -> Dict:
+    """aggregates the win rate, guesses per game and decision latency percentiles of one board"""
+    results = [r for r in results if r["board"] == name]
+    decision_times = np.array([t for r in results for t in r["decision_us"]]) / 1000
+    p50, p90, p99 = np.percentile(decision_times, [50, 90, 99]) if len(decision_times) > 0 else (0, 0, 0)
+    return {
+        "games": len(results),
+        "win rate": np.mean([r["won"] for r in results]),
+        "guesses": np.mean([r["guesses"] for r in results]),
+        "p50 ms": p50,
+        "p90 ms": p90,
+        "p99 ms": p99,
+    }
+
+
+def run_selfplay(name: str, size, mine_count: int, games: int, seed: int, path: str, processes: int) -> float:
+    """plays the seeds seed..seed+games-1 of a board in a process pool that haven't been played yet
+    and appends every result to the file as soon as it's done. returns the games per second"""
+    done_seeds = get_done_seeds(load_results(path), name)
+    tasks = [(name, tuple(size), mine_count, s) for s in range(seed, seed + games) if s not in done_seeds]
+    if len(tasks) == 0:
+        return 0
+
+    start_time = time.perf_counter()
+    with Pool(processes) as pool, open(path, "a+") as file:
+        # finish a line cut off by an interrupted run, so the next result starts on its own line
+        if file.tell() > 0:
+            file.seek(file.tell() - 1)
+            if file.read(1) != "\n":
+                file.write("\n")
+        # games are short, larger chunks keep the overhead of sending them to the workers low
+        chunksize = max(1, min(64, len(tasks) // (4 * processes)))
+        for record in pool.imap_unordered(play_seed, tasks, chunksize):
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+    return len(tasks) / (time.perf_counter() - start_time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="plays many seeded simulated games on all cores and collects win rate and latency")
+    parser.add_argument("boards", nargs="*", default=["easy", "medium", "hard"],
+                        help="presets (easy, medium, hard) or custom boards as WxHxMINES")
+    parser.add_argument("-n", "--games", type=int, default=1000, help="games per board")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("-o", "--output", default="selfplay.jsonl",
+                        help="file the results are appended to, games already in it are not played again")
+    parser.add_argument("-j", "--processes", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args()
+
+    speeds = {}
+    for text in args.boards:
+        name, (size, mine_count) = benchmark.parse_board(text)
+        speeds[name] = run_selfplay(name, size, mine_count, args.games, args.seed, args.output, args.processes)
+
+    results = load_results(args.output)
+    print(f"{'board':>12} {'games':>7} {'games/s':>8} {'win rate':>9} {'guesses':>8} {'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7}")
+    for name, games_per_second in speeds.items():
+        stats = summarize(results, name)
+        print(f"{name:>12} {stats['games']:>7} {games_per_second:>8.1f} {stats['win rate']:>9.2%} {stats['guesses']:>8.2f} "
+              f"{stats['p50 ms']:>7.2f} {stats['p90 ms']:>7.2f} {stats['p99 ms']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
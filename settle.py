@@ -0,0 +1,117 @@
+import capture
+
+from typing import Tuple, Collection
+import numpy as np
+import time
+
+
+class SettleDetector:
+    """watches the area around clicked squares until the reveal animation stopped,
+    instead of waiting a fixed worst case time. keeps the measured times so delays can adapt to the machine"""
+
+    def __init__(
+            self,
+            screen: capture.Capture,
+            game_rect: Tuple[np.ndarray, np.ndarray],
+            square_count: np.ndarray,
+            stable_time=0.05,
+            timeout=1.0,
+            poll_interval=0.005,
+            default_reaction_time=0.1):
+        self.screen = screen
+        self.game_rect = game_rect
+        self.square_count = square_count
+        # how long the frames have to stay identical until the area counts as settled.
+        # longer than a frame of the browser animation, so a slow animation isn't taken for a still one
+        self.stable_time = stable_time
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        # assumed until a reaction was measured, e.g. when the bot starts in the middle of a game
+        self.default_reaction_time = default_reaction_time
+
+        # seconds from the click until the screen first changed / stopped changing
+        self.reaction_times = []
+        self.settle_times = []
+        self._region = None
+        self._reference = None
+
+    def start(self, squares: Collection[Tuple[int, int]]):
+        """remembers how the area around the squares looks before clicking them"""
+        self._region = self.get_region(squares)
+        self._reference = self._grab_fingerprint()
+
+    def wait(self) -> float:
+        """waits after a click until the area around the squares passed to start() stopped changing
+        and returns how long that took. gives up after the timeout, e.g. if the click didn't change anything"""
+        start_time = time.perf_counter()
+        last_fingerprint = self._reference
+        last_change_time = None
+        reaction_time = None
+
+        while time.perf_counter() - start_time < self.timeout:
+            time.sleep(self.poll_interval)
+            fingerprint = self._grab_fingerprint()
+            now = time.perf_counter()
+
+            if fingerprint != last_fingerprint:
+                if reaction_time is None:
+                    reaction_time = now - start_time
+                last_change_time = now
+            # only count the area as settled once it changed at all
+            elif last_change_time is not None and now - last_change_time >= self.stable_time:
+                break
+            last_fingerprint = fingerprint
+
+        # the time until the last change, without the time it took to be sure nothing changes anymore
+        settle_time = (last_change_time if last_change_time is not None else time.perf_counter()) - start_time
+        if reaction_time is not None:
+            self.reaction_times.append(reaction_time)
+        self.settle_times.append(settle_time)
+        return settle_time
+
+    def wait_for_quiet(self, squares: Collection[Tuple[int, int]], input_time: float) -> float:
+        """waits after inputs on the squares (the last one done at input_time) until their area stopped changing.
+        the screen reacts late, so the area has to stay still until stable_time after the slowest measured reaction time,
+        and it's given up after the slowest measured settle time. returns how long it waited.
+        a change seen here can be the result of an earlier input, so only the settle time is measured here,
+        a reaction time measured like this could be too short"""
+        start_time = time.perf_counter()
+        self._region = self.get_region(squares)
+        reaction_time = max(self.reaction_times, default=self.default_reaction_time)
+        # one reaction time sample can be a few polls short of the next reaction
+        earliest_end = input_time + reaction_time + self.stable_time
+        latest_end = input_time + (2 * max(self.settle_times) + self.stable_time if self.settle_times else self.timeout)
+        latest_end = max(latest_end, earliest_end + self.stable_time)
+
+        last_fingerprint = self._grab_fingerprint()
+        last_change_time = None
+        quiet_since = start_time
+        while True:
+            now = time.perf_counter()
+            if now >= latest_end or (now >= earliest_end and now - quiet_since >= self.stable_time):
+                break
+            time.sleep(self.poll_interval)
+            fingerprint = self._grab_fingerprint()
+            now = time.perf_counter()
+            if fingerprint != last_fingerprint:
+                last_change_time = now
+                quiet_since = now
+            last_fingerprint = fingerprint
+
+        if last_change_time is not None:
+            self.settle_times.append(last_change_time - input_time)
+        return time.perf_counter() - start_time
+
+    def get_region(self, squares: Collection[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """returns the pixel rect around the squares and their neighbors"""
+        squares = np.array([tuple(s) for s in squares])
+        square_size = self.game_rect[1] / self.square_count
+        min_square = np.maximum(squares.min(axis=0) - 1, 0)
+        max_square = np.minimum(squares.max(axis=0) + 2, self.square_count)
+
+        region_min = np.floor(self.game_rect[0] + min_square * square_size).astype(int)
+        region_max = np.ceil(self.game_rect[0] + max_square * square_size).astype(int)
+        return region_min, region_max - region_min
+
+    def _grab_fingerprint(self) -> int:
+        return hash(self.screen.grab(self._region).tobytes())
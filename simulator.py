@@ -0,0 +1,294 @@
+import game
+import probability
+import pipeline
+import planner
+
+from typing import Dict, Tuple, Collection, List
+from dataclasses import dataclass, field
+import numpy as np
+import time
+
+
+class SimulatedBoard:
+    """an in-process minesweeper board that can be played instead of the one on the screen.
+    offers the same "read squares / flag / chord" surface as the screen functions in sweep.py"""
+
+    def __init__(self, size, mine_count: int, seed=None):
+        self.size = np.array(size)
+        self.mine_count = mine_count
+        self.rng = np.random.default_rng(seed)
+
+        # mines are placed on the first reveal, like in the google game the first click is always a zero
+        self.mines = None
+        self.revealed = np.zeros(tuple(self.size), dtype=bool)
+        self.flagged = np.zeros(tuple(self.size), dtype=bool)
+        self.counts = None
+
+        self.is_lost = False
+        self.move_count = 0
+
+    @classmethod
+    def from_preset(cls, name: str, seed=None):
+        size, mine_count = game.PRESETS[name]
+        return cls(size, mine_count, seed)
+
+    @property
+    def is_won(self) -> bool:
+        return self.mines is not None and not self.is_lost and self.revealed.sum() == self.mines.size - self.mine_count
+
+    def read_square_values(self, squares_to_read: Collection[Tuple[int, int]]) -> Dict[Tuple[int, int], int]:
+        """returns the visible values of the squares like read_square_values does for a screenshot.
+        covered squares are left out like there"""
+        read_mask = game.get_square_mask(squares_to_read, self.size) & self.revealed
+        return {(x, y): int(self.counts[x, y]) for x, y in np.argwhere(read_mask).tolist()}
+
+    def mark_mine(self, square: Tuple[int, int]):
+        """flags a square like a right click"""
+        self.move_count += 1
+        self.flagged[tuple(square)] = True
+
+    def reveal_neighbors(self, square: Tuple[int, int]):
+        """left-right clicks a square: reveals it if it's covered,
+        otherwise reveals all unflagged neighbors if enough flags are around it"""
+        self.move_count += 1
+        square = tuple(square)
+
+        if self.mines is None:
+            self._place_mines(square)
+
+        if not self.revealed[square]:
+            self._reveal(square)
+            return
+
+        neighbors = self.get_neighbor_squares(square)
+        if sum(self.flagged[s] for s in neighbors) != self.counts[square]:
+            return
+        for s in neighbors:
+            if not self.flagged[s] and not self.revealed[s]:
+                self._reveal(s)
+
+    def reveal_square(self, square: Tuple[int, int]):
+        """reveals a covered square like a left click"""
+        self.move_count += 1
+        square = tuple(square)
+
+        if self.mines is None:
+            self._place_mines(square)
+        if not self.revealed[square] and not self.flagged[square]:
+            self._reveal(square)
+
+    def get_neighbor_squares(self, square) -> List[Tuple[int, int]]:
+        x, y = square
+        return [
+            (nx, ny)
+            for nx in range(max(0, x - 1), min(self.size[0], x + 2))
+            for ny in range(max(0, y - 1), min(self.size[1], y + 2))
+            if nx != x or ny != y]
+
+    def _place_mines(self, first_square):
+        """randomly places the mines, sparing the first clicked square and its neighbors"""
+        w, h = self.size
+        spared = set(self.get_neighbor_squares(first_square)) | {tuple(first_square)}
+        candidates = [i for i in range(w * h) if (i // h, i % h) not in spared]
+        mine_indices = self.rng.choice(candidates, size=self.mine_count, replace=False)
+
+        self.mines = np.zeros(w * h, dtype=bool)
+        self.mines[mine_indices] = True
+        self.mines = self.mines.reshape((w, h))
+
+        padded = np.pad(self.mines, 1).astype(np.int8)
+        self.counts = sum(
+            padded[1 + dx:1 + dx + w, 1 + dy:1 + dy + h]
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx != 0 or dy != 0)
+
+    def _reveal(self, square):
+        """reveals a square and flood fills zeros"""
+        if self.mines[square]:
+            self.is_lost = True
+            self.revealed[square] = True
+            return
+
+        stack = [square]
+        while stack:
+            s = stack.pop()
+            if self.revealed[s] or self.flagged[s]:
+                continue
+            self.revealed[s] = True
+            if self.counts[s] == 0:
+                stack.extend(self.get_neighbor_squares(s))
+
+
+class SimulatedBatch:
+    """B simulated boards of the same size as stacked (B, columns, rows) masks for the batch solver.
+    all boards get their first click on the same square and are revealed with boolean masks"""
+
+    def __init__(self, batch_size: int, size, mine_count: int, seed=None):
+        self.size = np.array(size)
+        self.mine_count = mine_count
+        self.rng = np.random.default_rng(seed)
+
+        shape = (batch_size, *self.size)
+        self.mines = np.zeros(shape, dtype=bool)
+        self.counts = np.zeros(shape, dtype=np.int8)
+        self.revealed = np.zeros(shape, dtype=bool)
+        self.is_lost = np.zeros(batch_size, dtype=bool)
+
+    @property
+    def is_won(self) -> np.ndarray:
+        return ~self.is_lost & (self.revealed.sum(axis=(1, 2)) == self.size.prod() - self.mine_count)
+
+    def first_click(self, square: Tuple[int, int]):
+        """places the mines of all boards, sparing the clicked square and its neighbors, and reveals the square"""
+        batch_size = len(self.mines)
+        w, h = self.size
+        # random keys, the smallest ones become mines. spared squares get keys that are never picked
+        keys = self.rng.random((batch_size, w, h))
+        x, y = square
+        keys[:, max(0, x - 1):x + 2, max(0, y - 1):y + 2] = 2
+        keys = keys.reshape(batch_size, -1)
+        mine_indices = np.argpartition(keys, self.mine_count - 1, axis=1)[:, :self.mine_count]
+
+        mines = np.zeros(keys.shape, dtype=bool)
+        np.put_along_axis(mines, mine_indices, True, axis=1)
+        self.mines = mines.reshape(self.mines.shape)
+        self.counts = game.count_neighbors(self.mines)
+
+        click = np.zeros(self.mines.shape, dtype=bool)
+        click[:, x, y] = True
+        self.reveal(click)
+
+    def reveal(self, mask: np.ndarray):
+        """reveals the squares of a (B, columns, rows) mask and flood fills zeros. boards hitting a mine are lost"""
+        mask = mask & ~self.is_lost[:, None, None]
+        self.is_lost |= (mask & self.mines).any(axis=(1, 2))
+        self.revealed |= mask & ~self.mines
+
+        while True:
+            zeros = self.revealed & (self.counts == 0)
+            grown = (game.count_neighbors(zeros) > 0) & ~self.revealed & ~self.mines
+            if not grown.any():
+                break
+            self.revealed |= grown
+
+
+def load_tiles(square_size: int) -> Dict[Tuple[int, int], np.ndarray]:
+    """cuts the square images out of res/numbers.png and scales them to the square size.
+    returns them by (value, checkerboard parity), value 9 is a flag"""
+    from PIL import Image
+    all_nums_img = Image.open("res/numbers.png").convert("RGB")
+    tile_len = 21
+    padding = 2
+    inner_size = square_size - 2 * padding
+    # colors of the light and dark squares
+    grass_colors = [(170, 215, 81), (162, 209, 73)]
+    dirt_colors = [(229, 194, 159), (215, 184, 153)]
+
+    tiles = {}
+    for i in range(11):
+        for row in range(2):
+            img = all_nums_img.crop((i * tile_len, row * tile_len, (i + 1) * tile_len, (row + 1) * tile_len))
+            img = img.resize((inner_size, inner_size), Image.NEAREST)
+            value = i - 1 if i < 10 else 9
+            colors = grass_colors if value in (-1, 9) else dirt_colors
+            # the light and dark images are mixed up between the rows, tell them apart by their corner color
+            corner = tuple(img.getpixel((0, 0)))
+            parity = colors.index(corner) if corner in colors else row
+
+            tile = np.empty((square_size, square_size, 3), dtype=np.uint8)
+            tile[:] = colors[parity]
+            # there is no image for 8, it's drawn as a blank dirt square
+            if value != 8:
+                tile[padding:-padding, padding:-padding] = np.asarray(img)
+            tiles[value, parity] = tile
+    return tiles
+
+
+def render_board(board: SimulatedBoard, square_size=25, tiles=None) -> np.ndarray:
+    """renders the visible state of a simulated board like the google game draws it, as a (h, w, 3) array"""
+    if tiles is None:
+        tiles = load_tiles(square_size)
+    w, h = board.size
+    im_array = np.empty((h * square_size, w * square_size, 3), dtype=np.uint8)
+
+    for x in range(w):
+        for y in range(h):
+            if board.flagged[x, y]:
+                value = 9
+            elif board.revealed[x, y]:
+                value = int(board.counts[x, y])
+            else:
+                value = -1
+            im_array[y * square_size:(y + 1) * square_size, x * square_size:(x + 1) * square_size] = tiles[value, (x + y) % 2]
+    return im_array
+
+
+def render_screenshot(board: SimulatedBoard, resolution=(1920, 1080), square_size=25, position=(300, 200)) -> np.ndarray:
+    """renders a simulated board onto a white screen at a position"""
+    im_array = np.full((resolution[1], resolution[0], 3), 255, dtype=np.uint8)
+    board_array = render_board(board, square_size)
+    x, y = position
+    im_array[y:y + board_array.shape[0], x:x + board_array.shape[1]] = board_array
+    return im_array
+
+
+@dataclass
+class GameResult:
+    won: bool
+    lost: bool
+    move_count: int
+    update_times: List[float] = field(default_factory=list)
+    reevaluated_counts: List[int] = field(default_factory=list)
+    guess_count: int = 0
+    # seconds from reading new squares until the next moves were chosen, per turn
+    decision_times: List[float] = field(default_factory=list)
+
+
+def play_game(board: SimulatedBoard, plan=False, dispatcher=None, max_turns=None) -> GameResult:
+    """plays a simulated board with the same decisions as the bot in sweep.py.
+    with plan the moves are ordered by the click planner, a (dry run) dispatcher gets every move the board gets.
+    with max_turns the game is stopped after that many turns, e.g. to time updates on huge boards"""
+    update_times = []
+    reevaluated_counts = []
+    decision_times = []
+
+    def update_game(my_game) -> float:
+        new_values = board.read_square_values(my_game.covered_squares)
+        start = time.perf_counter()
+        my_game.update(new_values)
+        update_times.append(time.perf_counter() - start)
+        reevaluated_counts.append(my_game.reevaluated_count)
+        return start
+
+    my_game = game.Game(board.size)
+    update_game(my_game)
+    guesser = probability.ProbabilitySolver()
+    guess_count = 0
+
+    size = my_game.size
+    position = (size[0] // 2, size[1] // 2)
+    board.reveal_neighbors(position)
+    seen_time = update_game(my_game)
+    issued_moves = set()
+
+    while not board.is_lost and (max_turns is None or len(update_times) < max_turns):
+        moves = pipeline.get_moves(my_game, issued_moves)
+        if plan:
+            moves = planner.plan_moves(moves, my_game, position)
+
+        if len(moves) == 0:
+            if board.is_won:
+                break
+            guess, _ = guesser.find_safest_square(my_game, board.mine_count)
+            moves = [("reveal_square", guess)]
+            guess_count += 1
+        decision_times.append(time.perf_counter() - seen_time)
+
+        for action_name, square in moves:
+            issued_moves.add((action_name, square))
+            getattr(board, action_name)(square)
+            if dispatcher is not None:
+                getattr(dispatcher, action_name)(square)
+        position = moves[-1][1]
+        seen_time = update_game(my_game)
+
+    return GameResult(board.is_won, board.is_lost, board.move_count, update_times, reevaluated_counts, guess_count, decision_times)
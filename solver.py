@@ -0,0 +1,161 @@
+import game
+import metrics
+
+from typing import Dict, Tuple, Set, List, FrozenSet
+from collections import defaultdict
+from dataclasses import dataclass, field
+import time
+
+Square = Tuple[int, int]
+# a set of covered squares and the number of mines among them
+Constraint = Tuple[FrozenSet[Square], int]
+
+
+@dataclass
+class Deduction:
+    safe_squares: Set[Square] = field(default_factory=set)
+    mine_squares: Set[Square] = field(default_factory=set)
+    # seconds spent on each independent frontier component
+    component_times: List[float] = field(default_factory=list)
+
+
+def get_frontier_constraints(my_game: game.Game) -> List[Constraint]:
+    """creates one constraint for every uncertain square: its covered neighbors contain its number minus the flagged mines"""
+    constraints = []
+    for square in my_game.uncertain_squares:
+        covered_neighbors = frozenset(my_game.get_covered_neighbors(square))
+        mine_count = int(my_game.square_val(square)) - my_game.get_neighbor_mine_count(square)
+
+        # misread numbers can create constraints that cannot be met, better skip them than deduce nonsense
+        if len(covered_neighbors) > 0 and 0 <= mine_count <= len(covered_neighbors):
+            constraints.append((covered_neighbors, mine_count))
+    return constraints
+
+
+def split_components(constraints: List[Constraint]) -> List[List[Constraint]]:
+    """groups constraints that (transitively) share covered squares, the groups can be solved independently"""
+    parents = {}
+
+    def find(square):
+        while parents[square] != square:
+            parents[square] = parents[parents[square]]
+            square = parents[square]
+        return square
+
+    for cells, _ in constraints:
+        for square in cells:
+            parents.setdefault(square, square)
+        first = find(next(iter(cells)))
+        for square in cells:
+            parents[find(square)] = first
+
+    components = defaultdict(list)
+    for constraint in constraints:
+        components[find(next(iter(constraint[0])))].append(constraint)
+    return list(components.values())
+
+
+class ConstraintReducer:
+    """applies subset and pairwise overlap reasoning to the constraints of one component.
+    new or changed constraints are put on a worklist, so only constraints touching them get revisited"""
+
+    def __init__(self, constraints: List[Constraint]):
+        self.constraints = set()
+        self.constraints_by_square = defaultdict(set)
+        self.worklist = []
+        # squares that are known to be safe (False) or mines (True)
+        self.known = {}
+
+        for constraint in constraints:
+            self._add(constraint)
+
+    def reduce(self) -> Dict[Square, bool]:
+        while self.worklist:
+            constraint = self.worklist.pop()
+            if constraint not in self.constraints:
+                continue
+            cells, mine_count = constraint
+
+            if mine_count == 0 or mine_count == len(cells):
+                for square in cells:
+                    self._set_known(square, mine_count > 0)
+                continue
+
+            for other in self._get_overlapping(constraint):
+                for derived in derive_constraints(constraint, other):
+                    self._add(derived)
+        return self.known
+
+    def _get_overlapping(self, constraint: Constraint) -> Set[Constraint]:
+        overlapping = set()
+        for square in constraint[0]:
+            overlapping.update(self.constraints_by_square[square])
+        overlapping.discard(constraint)
+        return overlapping
+
+    def _set_known(self, square: Square, is_mine: bool):
+        """removes a solved square from all constraints containing it"""
+        if square in self.known:
+            return
+        self.known[square] = is_mine
+
+        for constraint in list(self.constraints_by_square[square]):
+            self._remove(constraint)
+            cells, mine_count = constraint
+            self._add((cells - {square}, mine_count - is_mine))
+
+    def _add(self, constraint: Constraint):
+        cells, mine_count = constraint
+        cells = frozenset(s for s in cells if s not in self.known)
+        mine_count -= sum(self.known[s] for s in constraint[0] if s in self.known)
+        constraint = (cells, mine_count)
+
+        if len(cells) == 0 or constraint in self.constraints or not 0 <= mine_count <= len(cells):
+            return
+        self.constraints.add(constraint)
+        for square in cells:
+            self.constraints_by_square[square].add(constraint)
+        self.worklist.append(constraint)
+
+    def _remove(self, constraint: Constraint):
+        self.constraints.discard(constraint)
+        for square in constraint[0]:
+            self.constraints_by_square[square].discard(constraint)
+
+
+def derive_constraints(a: Constraint, b: Constraint) -> List[Constraint]:
+    """derives new constraints from two overlapping ones"""
+    cells_a, mines_a = a
+    cells_b, mines_b = b
+
+    if cells_a < cells_b:
+        return [(cells_b - cells_a, mines_b - mines_a)]
+    if cells_b < cells_a:
+        return [(cells_a - cells_b, mines_a - mines_b)]
+
+    only_a = cells_a - cells_b
+    only_b = cells_b - cells_a
+    # the overlap holds at least mines_a - |only_a| mines. if that already meets mines_b,
+    # all of only_a are mines and only_b is safe
+    if mines_a - len(only_a) == mines_b:
+        return [(only_a, len(only_a)), (only_b, 0)]
+    if mines_b - len(only_b) == mines_a:
+        return [(only_b, len(only_b)), (only_a, 0)]
+    return []
+
+
+def find_certain_squares(my_game: game.Game) -> Deduction:
+    """finds all squares of the frontier that are certainly safe or certainly mines"""
+    deduction = Deduction()
+
+    components = split_components(get_frontier_constraints(my_game))
+    metrics.count("solver_components", len(components))
+    for component in components:
+        start = time.perf_counter()
+        known = ConstraintReducer(component).reduce()
+        deduction.component_times.append(time.perf_counter() - start)
+        metrics.observe("solve_component", deduction.component_times[-1])
+
+        for square, is_mine in known.items():
+            (deduction.mine_squares if is_mine else deduction.safe_squares).add(square)
+    return deduction
@@ -0,0 +1,150 @@
+from typing import Tuple, Collection, Optional
+import os
+import numpy as np
+
+# side length every template and square crop is resampled to
+BANK_SIZE = 12
+# sub samples per template pixel and axis, averaged like a box filter
+SUPERSAMPLING = 2
+# the number images cover the square without this margin (2 px of a 25 px square)
+MARGIN = 2 / 25
+# square sizes in pixels the number images are rendered at before resampling,
+# so the bank has a variant with the blur of every common zoom level
+SCALES = (16, 20, 25, 33, 40, 50)
+
+NUMBERS_PATH = "res/numbers.png"
+BANK_PATH = "res/template_bank.npy"
+# squares harvested from live frames, added to the bank again when it's rebuilt
+HARVEST_PATH = "res/template_harvest.npy"
+
+BANK_DTYPE = np.dtype([("value", np.int8), ("pixels", np.uint8, (BANK_SIZE, BANK_SIZE, 3))])
+
+
+def get_sample_offsets(size: int) -> np.ndarray:
+    """returns where the sub samples of a row of size template pixels are, as fractions between 0 and 1"""
+    count = size * SUPERSAMPLING
+    return (np.arange(count) + 0.5) / count
+
+
+def resample_squares(
+        im_array: np.ndarray,
+        game_rect: Tuple[np.ndarray, np.ndarray],
+        square_count: np.ndarray,
+        squares: np.ndarray,
+        margin=MARGIN) -> np.ndarray:
+    """resamples the squares (K, 2) of an image to a (K, BANK_SIZE, BANK_SIZE, 3) array in one gather.
+    the cost only depends on the number of squares, not on how large they are on the screen"""
+    square_size = game_rect[1] / square_count
+    offsets = margin + get_sample_offsets(BANK_SIZE) * (1 - 2 * margin)
+
+    square_mins = game_rect[0] + squares * square_size
+    xs = np.floor(square_mins[:, 0, None] + offsets * square_size[0]).astype(int)
+    ys = np.floor(square_mins[:, 1, None] + offsets * square_size[1]).astype(int)
+    xs = np.clip(xs, 0, im_array.shape[1] - 1)
+    ys = np.clip(ys, 0, im_array.shape[0] - 1)
+
+    samples = im_array[ys[:, :, None], xs[:, None, :], :3].astype(np.uint16)
+    samples = samples.reshape(len(squares), BANK_SIZE, SUPERSAMPLING, BANK_SIZE, SUPERSAMPLING, 3)
+    # adding the few sub sample slices is a lot faster than mean() over the reshaped axes
+    total = sum(samples[:, :, i, :, j] for i in range(SUPERSAMPLING) for j in range(SUPERSAMPLING))
+    count = SUPERSAMPLING ** 2
+    return ((total + count // 2) // count).astype(np.uint8)
+
+
+def get_mse_matrix(crops: np.ndarray, templates: np.ndarray) -> np.ndarray:
+    """returns the mean squared errors between all K crops and all T templates as a (K, T) matrix.
+    uses |a - b|^2 = |a|^2 - 2ab + |b|^2 so no (K, T, h, w, 3) difference array is needed"""
+    a = crops.reshape(len(crops), -1).astype(np.float32)
+    b = templates.reshape(len(templates), -1).astype(np.float32)
+    errors = (a * a).sum(axis=1)[:, None] - 2 * a @ b.T + (b * b).sum(axis=1)[None, :]
+    return errors / a.shape[1]
+
+
+def build_bank(numbers_path=NUMBERS_PATH) -> np.ndarray:
+    """cuts the number images out of numbers.png and renders every one at all SCALES, resampled to the bank size"""
+    from PIL import Image
+    all_nums_img = Image.open(numbers_path).convert("RGB")
+    tile_len = 21
+
+    entries = []
+    for i in range(all_nums_img.width // tile_len):
+        for row in range(all_nums_img.height // tile_len):
+            img = all_nums_img.crop((i * tile_len, row * tile_len, (i + 1) * tile_len, (row + 1) * tile_len))
+            for scale in SCALES:
+                inner_len = max(1, round(scale * (1 - 2 * MARGIN)))
+                scaled = np.asarray(img.resize((inner_len, inner_len), Image.BILINEAR))
+                # the image is the inside of the square already, so it's resampled without a margin
+                size = np.array([inner_len, inner_len])
+                pixels = resample_squares(scaled, (np.zeros(2), size), np.ones(2), np.zeros((1, 2)), margin=0)[0]
+                entries.append((i - 1, pixels))
+
+    bank = np.empty(len(entries), dtype=BANK_DTYPE)
+    for j, (value, pixels) in enumerate(entries):
+        bank[j] = value, pixels
+    return bank
+
+
+class TemplateBank:
+    """number templates of one small fixed size, stored in a .npy file that is memory mapped instead of decoded.
+    the file is built from numbers.png on the first start and again whenever numbers.png changes,
+    the harvested squares are kept when it's rebuilt. a bank file can be shipped without numbers.png"""
+
+    def __init__(self, path=BANK_PATH, numbers_path=NUMBERS_PATH, harvest_path=HARVEST_PATH):
+        self.path = path
+        self.harvest_path = harvest_path
+        # without numbers.png the bank file is used as it is
+        if not os.path.exists(path) or (os.path.exists(numbers_path) and os.path.getmtime(path) < os.path.getmtime(numbers_path)):
+            np.save(path, np.concatenate([build_bank(numbers_path), self._load_harvested()]))
+        self.bank = np.load(path, mmap_mode="r")
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.bank["value"]
+
+    @property
+    def templates(self) -> np.ndarray:
+        return self.bank["pixels"]
+
+    def read(
+            self,
+            im_array: np.ndarray,
+            game_rect: Tuple[np.ndarray, np.ndarray],
+            square_count: np.ndarray,
+            squares: np.ndarray) -> np.ndarray:
+        """returns the values of the (K, 2) squares by their closest template"""
+        crops = resample_squares(im_array, game_rect, square_count, squares)
+        errors = get_mse_matrix(crops, self.templates)
+        return self.values[np.argmin(errors, axis=1)]
+
+    def harvest(
+            self,
+            im_array: np.ndarray,
+            game_rect: Tuple[np.ndarray, np.ndarray],
+            square_count: np.ndarray,
+            squares: Collection[Tuple[int, int]],
+            values: Collection[int],
+            min_error: Optional[float] = 50.0):
+        """adds the squares of a live frame with known values to the bank file, e.g. squares confirmed by another recognizer.
+        only squares that differ from all templates by more than min_error are added"""
+        squares = np.array([tuple(s) for s in squares]).reshape(-1, 2)
+        crops = resample_squares(im_array, game_rect, square_count, squares)
+        new = np.flatnonzero(get_mse_matrix(crops, self.templates).min(axis=1) > min_error)
+        if len(new) == 0:
+            return
+        # the same number looks the same in many squares of a frame, it's added once
+        _, first = np.unique(crops[new].reshape(len(new), -1), axis=0, return_index=True)
+        new = new[np.sort(first)]
+
+        entries = np.empty(len(new), dtype=BANK_DTYPE)
+        entries["value"] = np.array(list(values))[new]
+        entries["pixels"] = crops[new]
+        np.save(self.harvest_path, np.concatenate([self._load_harvested(), entries]))
+        bank = np.concatenate([np.asarray(self.bank), entries])
+        del self.bank
+        np.save(self.path, bank)
+        self.bank = np.load(self.path, mmap_mode="r")
+
+    def _load_harvested(self) -> np.ndarray:
+        if not os.path.exists(self.harvest_path):
+            return np.empty(0, dtype=BANK_DTYPE)
+        return np.load(self.harvest_path)